@@ -1,18 +1,22 @@
 from flask import Flask, jsonify, request, make_response, Response, stream_with_context
 from flask_cors import CORS
+from postgrest.exceptions import APIError
 import jwt
 import json
+from datetime import datetime, timezone
 
 from backend.config import Config
 from backend.models.legal_brief_analyzer import LegalBriefAnalyzer
 from backend.services.inlegalbert_processor import InLegalBERTProcessor
 from backend.services.indian_kanoon import IndianKanoonAPI
-from backend.services.supabase_client import SupabaseClient
+from backend.services.supabase_client import get_supabase_client
 from backend.services.claude_client import ClaudeClient
 from backend.services.jurisdiction_resolver import JurisdictionResolver
 from backend.services.speech_service import SpeechService
 from backend.services.document_service import DocumentService
+from backend.services.activity_logger import ActivityLogger
 from backend.utils.logger import setup_logger
+from backend.utils.json_provider import ORJSON_AVAILABLE, ORJSONProvider
 
 # ---------------------------------------------------------------------------
 # Admin configuration (no SaaS – hard-coded admin roster)
@@ -23,12 +27,18 @@ ADMIN_USERS = {
 }
 
 import os
+import re
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 # ---------------------------------------------------------------------------
 # App bootstrap
 # ---------------------------------------------------------------------------
 app = Flask(__name__)
+if ORJSON_AVAILABLE:
+    app.json = ORJSONProvider(app)
 
 ALLOWED_ORIGINS = [
     "https://lex-assist.vercel.app",
@@ -43,6 +53,21 @@ if extra:
 CORS(app, supports_credentials=True, origins=ALLOWED_ORIGINS)
 logger = setup_logger()
 
+# CORS headers are identical for every request from a given origin,
+# so build them once per allowed origin at import time.
+_CORS_ALLOW_METHODS = "GET, POST, PUT, PATCH, DELETE, OPTIONS"
+_CORS_ALLOW_HEADERS = "Content-Type, Authorization, X-Requested-With, Accept"
+_PREFLIGHT_HEADERS = {
+    origin: {
+        "Access-Control-Allow-Origin": origin,
+        "Access-Control-Allow-Credentials": "true",
+        "Access-Control-Allow-Methods": _CORS_ALLOW_METHODS,
+        "Access-Control-Allow-Headers": _CORS_ALLOW_HEADERS,
+        "Access-Control-Max-Age": "86400",
+    }
+    for origin in ALLOWED_ORIGINS
+}
+
 # ---------------------------------------------------------------------------
 # Global error handlers — ensure JSON + CORS headers even on crashes
 # ---------------------------------------------------------------------------
@@ -61,12 +86,8 @@ def handle_exception(e):
 def add_cors_headers(response):
     """Ensure CORS headers are present on ALL responses, including errors and preflights."""
     origin = request.headers.get("Origin", "")
-    if origin in ALLOWED_ORIGINS:
-        response.headers["Access-Control-Allow-Origin"] = origin
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, PATCH, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Requested-With, Accept"
-        response.headers["Access-Control-Max-Age"] = "86400"
+    if origin in _PREFLIGHT_HEADERS:
+        response.headers.update(_PREFLIGHT_HEADERS[origin])
     return response
 
 
@@ -74,15 +95,8 @@ def add_cors_headers(response):
 def handle_preflight():
     """Return 200 immediately for CORS preflight (OPTIONS) requests."""
     if request.method == "OPTIONS":
-        response = make_response()
-        origin = request.headers.get("Origin", "")
-        if origin in ALLOWED_ORIGINS:
-            response.headers["Access-Control-Allow-Origin"] = origin
-            response.headers["Access-Control-Allow-Credentials"] = "true"
-            response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, PATCH, DELETE, OPTIONS"
-            response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Requested-With, Accept"
-            response.headers["Access-Control-Max-Age"] = "86400"
-        return response, 200
+        headers = _PREFLIGHT_HEADERS.get(request.headers.get("Origin", ""))
+        return Response(status=200, headers=headers)
 
 # ---------------------------------------------------------------------------
 # Service init (after error handlers so crashes during init are caught)
@@ -90,16 +104,30 @@ def handle_preflight():
 
 indian_kanoon = IndianKanoonAPI()
 inlegalbert = InLegalBERTProcessor()
-supabase = SupabaseClient()
+supabase = get_supabase_client()
 analyzer = LegalBriefAnalyzer(indian_kanoon=indian_kanoon, inlegalbert=inlegalbert)
 jurisdiction_resolver = JurisdictionResolver()
 claude = ClaudeClient()
 speech = SpeechService()
 document_service = DocumentService()
+activity_logger = ActivityLogger(supabase)
 
 # In-memory tracker for background deep-dive tasks  {brief_id: "running"|"complete"|"error"}
 _deep_dive_tasks: dict = {}
 
+# Deep dives run here rather than on a thread each: every run holds a full
+# multi-pass analysis in memory, so a burst of requests queues behind a
+# fixed number of runs instead of all running at once.  The runs are
+# I/O-bound Claude calls (greenlets under gevent), so several go at once.
+_DEEP_DIVE_WORKERS = 4
+_deep_dive_pool = ThreadPoolExecutor(max_workers=_DEEP_DIVE_WORKERS, thread_name_prefix="deep-dive")
+
+# The pool's own work queue is unbounded, so cap deep dives queued or running
+# at once; past this a request is turned away instead of piling up briefs.
+# At most one full round waits, so a queued run starts within one run's time.
+_DEEP_DIVE_MAX_PENDING = 2 * _DEEP_DIVE_WORKERS
+_deep_dive_slots = threading.BoundedSemaphore(_DEEP_DIVE_MAX_PENDING)
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
@@ -116,6 +144,17 @@ def _get_current_user():
         access_token = request.cookies.get("sb-access-token")
     if not access_token:
         return None, None
+    return _token_identity(access_token)
+
+
+@lru_cache(maxsize=1024)
+def _token_identity(access_token: str):
+    """(user_id, email) claimed by *access_token*, or (None, None).
+
+    Pure in the token, and a session sends the same token with every
+    request until it is refreshed — repeats are a dict lookup instead of
+    a base64 + JSON decode.
+    """
     try:
         payload = jwt.decode(access_token, options={"verify_signature": False})
         return payload.get("sub"), payload.get("email")
@@ -123,6 +162,189 @@ def _get_current_user():
         return None, None
 
 
+# LegalBriefAnalyzer primary case type → cases.case_type code (CHECK list in migration 006)
+_CASE_TYPE_CODES = {
+    "Criminal": "criminal",
+    "Civil": "civil",
+    "Constitutional / Writ": "constitutional",
+    "Family / Matrimonial": "family",
+    "Labour / Industrial": "labour",
+    "Consumer": "consumer",
+    "Commercial / Corporate": "corporate",
+    "Property / Land": "property",
+    "Motor Accident Claims": "civil",
+    "Arbitration": "arbitration",
+}
+
+
+def _case_type_code(analysis: dict) -> str:
+    """Return the cases.case_type code for a regex analysis result ('' when unclassified)."""
+    primary = (analysis.get("case_type") or {}).get("primary", "")
+    return _CASE_TYPE_CODES.get(primary, "")
+
+
+# Column lists shared by several endpoints — one definition keeps the
+# projections (and so the PostgREST request URLs) identical everywhere.
+_CASE_COLUMNS = "id, title, status, notes, folder_id, case_type, created_at, updated_at"
+_ACTIVITY_COLUMNS = "id, action, title, detail, metadata, created_at"
+
+# Allowed values checked by several handlers
+_USER_ROLES = frozenset({"user", "admin", "super_admin"})
+_CASE_STATUSES = frozenset({"active", "closed", "archived"})
+# Upload/OCR failure statuses caused by the client's file (400, not 500)
+_UPLOAD_CLIENT_ERRORS = frozenset({"unsupported_format", "file_too_large", "empty_file"})
+
+
+# Fan-out for independent PostgREST calls within one request. Every call gets
+# its own short-lived executor, so a request never queues behind other users'
+# queries. Under the gevent worker, threading is monkey-patched, so these run
+# as greenlets.
+_QUERY_FANOUT = 8  # Max concurrent queries per call
+
+
+def _execute_parallel(*queries):
+    """Execute PostgREST query builders concurrently; results in argument order."""
+    workers = max(1, min(len(queries), _QUERY_FANOUT))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-query") as pool:
+        futures = [pool.submit(q.execute) for q in queries]
+        return [f.result() for f in futures]
+
+
+def _in_background(fn, *args):
+    """Start ``fn(*args)`` on its own thread and return its Future."""
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-query")
+    try:
+        return pool.submit(fn, *args)
+    finally:
+        pool.shutdown(wait=False)  # the thread exits once fn returns
+
+
+# Postgres functions from optional migrations (008, 010, 012–014). When one
+# is not installed, callers use their client-side fallback, and the function
+# is not retried for a while so every request doesn't pay a doomed round trip
+# first.  Only PostgREST's "function not found" counts as not installed; any
+# other failure is raised.  For a write it may have come after the commit
+# (a read timeout) or from bad input, and replaying the inserts client-side
+# would duplicate rows — nor should one bad call disable the RPC for everyone.
+_RPC_RETRY_AFTER = 300  # seconds
+# Not in schema cache / undefined_function / undefined_column
+_RPC_MISSING_CODES = frozenset({"PGRST202", "42883", "42703"})
+_rpc_down_until: dict[str, float] = {}
+
+
+def _call_rpc(name: str, params: dict):
+    """Execute an RPC; ``None`` if the function is not installed.  Other errors raise."""
+    if time.monotonic() < _rpc_down_until.get(name, 0.0):
+        return None
+    try:
+        return supabase.client.rpc(name, params).execute()
+    except Exception as e:
+        if not (isinstance(e, APIError) and e.code in _RPC_MISSING_CODES):
+            raise
+        _rpc_down_until[name] = time.monotonic() + _RPC_RETRY_AFTER
+        logger.warning("%s RPC not installed, using fallback for %ds: %s", name, _RPC_RETRY_AFTER, e)
+        return None
+
+
+def _save_brief_analysis(
+    user_id: str,
+    case_id: str | None,
+    case_title: str,
+    case_type: str,
+    text: str,
+    analysis: dict,
+) -> tuple[str | None, str | None]:
+    """Persist a brief and its analysis, creating a case when *case_id* is empty.
+
+    The dependent inserts run in Postgres (``save_brief_analysis`` RPC,
+    migration 012) so the case → brief → analysis chain is one round trip.
+    If the function is unavailable, fall back to the client-side inserts.
+    Returns ``(case_id, brief_id)``.
+    """
+    title = text[:100].replace("\n", " ").strip()
+    res = _call_rpc("save_brief_analysis", {
+        "p_user_id": user_id,
+        "p_case_id": case_id or None,
+        "p_case_title": case_title,
+        "p_case_type": case_type,
+        "p_title": title,
+        "p_content": text,
+        "p_analysis": analysis,
+    })
+    if res is not None and res.data:
+        return res.data.get("case_id"), res.data.get("brief_id")
+
+    if not case_id:
+        case_row = supabase.client.table("cases").insert({
+            "user_id": user_id,
+            "title": case_title,
+            "status": "active",
+            "case_type": case_type,
+        }).execute()
+        case_id = case_row.data[0]["id"] if case_row.data else None
+
+    brief_row = supabase.client.table("briefs").insert({
+        "user_id": user_id,
+        "case_id": case_id,
+        "title": title,
+        "content": text,
+    }).execute()
+    brief_id = brief_row.data[0]["id"] if brief_row.data else None
+
+    if brief_id:
+        supabase.client.table("analysis_results").insert({
+            "user_id": user_id,
+            "brief_id": brief_id,
+            "analysis": analysis,
+        }).execute()
+    return case_id, brief_id
+
+
+def _save_case_entry(
+    user_id: str,
+    case_id: str,
+    title: str,
+    text: str,
+    document: dict | None,
+) -> tuple[str | None, str | None]:
+    """Persist a case-diary entry and its uploaded document's row.
+
+    The inserts run in Postgres (``save_case_entry`` RPC, migration 014) so
+    the brief → document chain is one round trip.  *document* holds the
+    ``case_documents`` columns other than the ids.  If the function is
+    unavailable, fall back to the client-side inserts.
+    Returns ``(brief_id, document_id)``.
+    """
+    res = _call_rpc("save_case_entry", {
+        "p_user_id": user_id,
+        "p_case_id": case_id,
+        "p_title": title,
+        "p_content": text,
+        "p_document": document,
+    })
+    if res is not None and res.data:
+        return res.data.get("brief_id"), res.data.get("document_id")
+
+    brief_row = supabase.client.table("briefs").insert({
+        "user_id": user_id,
+        "case_id": case_id,
+        "title": title,
+        "content": text,
+    }).execute()
+    brief_id = brief_row.data[0]["id"] if brief_row.data else None
+
+    document_id = None
+    if document and brief_id:
+        doc_row = supabase.client.table("case_documents").insert({
+            "user_id": user_id,
+            "case_id": case_id,
+            "brief_id": brief_id,
+            **document,
+        }).execute()
+        document_id = doc_row.data[0]["id"] if doc_row.data else None
+    return brief_id, document_id
+
+
 def _is_admin(email: str | None) -> dict | None:
     """Return the admin entry if *email* belongs to an admin, else None."""
     if not email:
@@ -171,42 +393,22 @@ def analyze_brief():
         user_id, _ = _get_current_user()
         if user_id and supabase.client:
             try:
-                # Auto-create a case diary
+                # Save full brief + analysis, auto-creating a case diary
                 case_id = data.get("case_id")
-                if not case_id:
-                    case_row = supabase.client.table("cases").insert({
-                        "user_id": user_id,
-                        "title": text[:100].replace("\n", " ").strip(),
-                        "status": "active",
-                    }).execute()
-                    case_id = case_row.data[0]["id"] if case_row.data else None
-
-                # Save full brief
-                brief_row = supabase.client.table("briefs").insert({
-                    "user_id": user_id,
-                    "case_id": case_id,
-                    "title": text[:100].replace("\n", " ").strip(),
-                    "content": text,
-                }).execute()
-                brief_id = brief_row.data[0]["id"] if brief_row.data else None
-
-                # Save analysis result
-                if brief_id:
-                    supabase.client.table("analysis_results").insert({
-                        "user_id": user_id,
-                        "brief_id": brief_id,
-                        "analysis": result,
-                    }).execute()
+                case_id, brief_id = _save_brief_analysis(
+                    user_id, case_id,
+                    text[:100].replace("\n", " ").strip(), _case_type_code(result),
+                    text, result,
+                )
 
                 snippet = text[:200].replace("\n", " ")
-                supabase.client.table("activity_log").insert({
-                    "user_id": user_id,
-                    "case_id": case_id,
-                    "action": "brief_analyzed",
-                    "title": "Brief Analysis",
-                    "detail": snippet,
-                    "metadata": {"brief_id": brief_id, "case_id": case_id},
-                }).execute()
+                activity_logger.log(
+                    user_id, "brief_analyzed",
+                    title="Brief Analysis",
+                    detail=snippet,
+                    metadata={"brief_id": brief_id, "case_id": case_id},
+                    case_id=case_id,
+                )
             except Exception as log_err:
                 logger.warning("Activity log write failed: %s", log_err)
 
@@ -292,9 +494,11 @@ def login():
         admin_info = _is_admin(user_email)
         role = profile.get("role", "user")
 
+        # mode="json" turns the user's datetimes into ISO strings here, so the
+        # payload is the same whichever JSON provider serialises it
         body = {
             "message": "Login successful",
-            "user": user_data.model_dump() if user_data else None,
+            "user": user_data.model_dump(mode="json") if user_data else None,
             "is_admin": role in ("super_admin", "admin"),
             "role": role,
             "full_name": profile.get("full_name", ""),
@@ -331,6 +535,8 @@ def setup_admins():
         return jsonify({"error": "Invalid setup secret"}), 403
 
     results = []
+    auth_ids = None  # email → auth user id, listed once on the first "already exists"
+    profile_rows = []  # (profile row, its results entry) — upserted together below
     for email_key, info in ADMIN_USERS.items():
         try:
             # Create user with phone as password (for Name+Phone login)
@@ -342,49 +548,64 @@ def setup_admins():
                 "user_metadata": {"full_name": info["name"]},
             })
             user_id = user.user.id if user.user else None
-            results.append({"email": email_key, "status": "created", "id": user_id})
+            entry = {"email": email_key, "status": "created", "id": user_id}
+            results.append(entry)
 
             # Also create their profile row with role
             if user_id:
-                try:
-                    supabase.client.table("profiles").upsert({
-                        "user_id": user_id,
-                        "full_name": info["name"],
-                        "email": email_key,
-                        "phone": info.get("phone"),
-                        "role": info["role"],
-                    }).execute()
-                except Exception as pe:
-                    logger.warning("Profile insert for %s failed: %s", email_key, pe)
+                profile_rows.append(({
+                    "user_id": user_id,
+                    "full_name": info["name"],
+                    "email": email_key,
+                    "phone": info.get("phone"),
+                    "role": info["role"],
+                }, entry))
 
         except Exception as e:
             err_msg = str(e)
             if "already" in err_msg.lower():
                 # User exists — update password to phone and ensure profile
                 try:
-                    auth_resp = supabase.client.auth.admin.list_users(page=1, per_page=1000)
-                    auth_users = auth_resp if isinstance(auth_resp, list) else getattr(auth_resp, 'users', auth_resp)
-                    for u in auth_users:
-                        if hasattr(u, 'email') and u.email and u.email.lower() == email_key:
-                            # Update password + phone for Name+Phone login
-                            supabase.client.auth.admin.update_user_by_id(
-                                u.id, {"password": info["phone"], "phone": info["phone"]}
-                            )
-                            supabase.client.table("profiles").upsert({
-                                "user_id": u.id,
-                                "full_name": info["name"],
-                                "email": email_key,
-                                "phone": info.get("phone"),
-                                "role": info["role"],
-                            }).execute()
-                            results.append({"email": email_key, "status": "updated_password", "id": u.id})
-                            break
+                    if auth_ids is None:
+                        auth_resp = supabase.client.auth.admin.list_users(page=1, per_page=1000)
+                        auth_users = auth_resp if isinstance(auth_resp, list) else getattr(auth_resp, 'users', auth_resp)
+                        auth_ids = {
+                            u.email.lower(): u.id
+                            for u in auth_users
+                            if getattr(u, 'email', None)
+                        }
+                    uid = auth_ids.get(email_key)
+                    if uid:
+                        # Update password + phone for Name+Phone login
+                        supabase.client.auth.admin.update_user_by_id(
+                            uid, {"password": info["phone"], "phone": info["phone"]}
+                        )
+                        entry = {"email": email_key, "status": "updated_password", "id": uid}
+                        results.append(entry)
+                        profile_rows.append(({
+                            "user_id": uid,
+                            "full_name": info["name"],
+                            "email": email_key,
+                            "phone": info.get("phone"),
+                            "role": info["role"],
+                        }, entry))
                     else:
                         results.append({"email": email_key, "status": "already_exists_no_match"})
                 except Exception as ue:
                     results.append({"email": email_key, "status": "already_exists", "update_error": str(ue)})
             else:
                 results.append({"email": email_key, "status": "error", "detail": err_msg})
+
+    # One bulk profiles upsert for every admin that has an auth user
+    if profile_rows:
+        try:
+            supabase.client.table("profiles").upsert([row for row, _ in profile_rows]).execute()
+        except Exception as pe:
+            logger.warning("Profile upsert for %d admin(s) failed: %s", len(profile_rows), pe)
+            for row, entry in profile_rows:
+                if entry["status"] == "updated_password":
+                    entry.clear()
+                    entry.update({"email": row["email"], "status": "already_exists", "update_error": str(pe)})
     return jsonify({"results": results}), 200
 
 
@@ -452,25 +673,70 @@ def update_profile():
         return jsonify({"error": str(e)}), 500
 
 
+# Empty shell returned when a user has no profile row yet, so the frontend doesn't error
+_EMPTY_PROFILE = {"full_name": "", "email": "", "phone": "", "address": "", "age": None}
+
+
 @app.route("/api/user/profile", methods=["GET"])
 def get_profile():
     user_id, _ = _get_current_user()
     if not user_id:
         return jsonify({"error": "Not authenticated"}), 401
+    if not supabase.client:
+        return jsonify({"profile": {"user_id": user_id, **_EMPTY_PROFILE}}), 200
     try:
         response = supabase.client.table("profiles").select("*").eq("user_id", user_id).execute()
-        if response.data and len(response.data) > 0:
+        if response.data:
             return jsonify({"profile": response.data[0]}), 200
-        # No profile row yet — return empty shell so frontend doesn't error
-        return jsonify({"profile": {"user_id": user_id, "full_name": "", "email": "", "phone": "", "address": "", "age": None}}), 200
     except Exception as e:
         logger.warning("Profile fetch error for %s: %s", user_id, e)
-        return jsonify({"profile": {"user_id": user_id, "full_name": "", "email": "", "phone": "", "address": "", "age": None}}), 200
+    return jsonify({"profile": {"user_id": user_id, **_EMPTY_PROFILE}}), 200
 
 # ---------------------------------------------------------------------------
 # User stats & activity history  (real data from activity_log)
 # ---------------------------------------------------------------------------
 
+# Stat name → activity_log actions it counts
+_STAT_ACTIONS = {
+    "briefsAnalyzed": ["brief_analyzed", "ai_brief_analyzed"],
+    "caseFilesGenerated": ["case_file_generated", "document_drafted"],
+    "documentsDownloaded": ["document_downloaded"],
+    "searchesPerformed": ["search_performed", "ai_chat"],
+}
+
+
+def _aggregate_user_stats(user_id: str) -> dict:
+    """Bucket a user's activity counts into the dashboard stats.
+
+    Grouping happens in Postgres (``activity_action_counts`` RPC, migration
+    008) so one row per distinct action comes back in a single round trip.
+    If the function is unavailable, fall back to one HEAD count per stat.
+    """
+    try:
+        res = _call_rpc("activity_action_counts", {"p_user_id": user_id})
+    except Exception as e:
+        # Read-only, so a failed call is safely answered by the per-stat counts
+        logger.warning("activity_action_counts RPC failed, counting per stat: %s", e)
+        res = None
+    if res is not None:
+        by_action = {r["action"]: r["total"] for r in (res.data or [])}
+        return {
+            stat: sum(by_action.get(a, 0) for a in actions)
+            for stat, actions in _STAT_ACTIONS.items()
+        }
+
+    # HEAD + count=exact: PostgREST returns only the row count, no rows.
+    # The per-stat counts are independent, so they run concurrently.
+    counts = _execute_parallel(*(
+        supabase.client.table("activity_log")
+        .select("id", count="exact", head=True)
+        .eq("user_id", user_id)
+        .in_("action", actions)
+        for actions in _STAT_ACTIONS.values()
+    ))
+    return {stat: res.count or 0 for stat, res in zip(_STAT_ACTIONS, counts)}
+
+
 @app.route("/api/user/stats", methods=["GET"])
 def user_stats():
     """Aggregate usage counts from the activity_log table."""
@@ -478,19 +744,7 @@ def user_stats():
     if not user_id:
         return jsonify({"error": "Not authenticated"}), 401
     try:
-        rows = (
-            supabase.client.table("activity_log")
-            .select("action")
-            .eq("user_id", user_id)
-            .execute()
-        )
-        actions = [r["action"] for r in (rows.data or [])]
-        return jsonify({
-            "briefsAnalyzed": actions.count("brief_analyzed") + actions.count("ai_brief_analyzed"),
-            "caseFilesGenerated": actions.count("case_file_generated") + actions.count("document_drafted"),
-            "documentsDownloaded": actions.count("document_downloaded"),
-            "searchesPerformed": actions.count("search_performed") + actions.count("ai_chat"),
-        }), 200
+        return jsonify(_aggregate_user_stats(user_id)), 200
     except Exception as e:
         logger.error("Stats error: %s", e)
         return jsonify({"error": str(e)}), 500
@@ -506,7 +760,7 @@ def get_case_detail(activity_id):
         # 1. Get the activity_log entry (verify ownership)
         activity = (
             supabase.client.table("activity_log")
-            .select("id, action, title, detail, metadata, created_at")
+            .select(_ACTIVITY_COLUMNS)
             .eq("id", activity_id)
             .eq("user_id", user_id)
             .single()
@@ -525,30 +779,27 @@ def get_case_detail(activity_id):
         }
 
         if brief_id:
-            # 2. Get full brief text
+            # 2. Full brief text with its latest analysis embedded through
+            #    the analysis_results.brief_id FK — one round trip.
             brief = (
                 supabase.client.table("briefs")
-                .select("id, title, content, created_at")
+                .select(
+                    "id, title, content, created_at, "
+                    "analysis_results(id, analysis, created_at)"
+                )
                 .eq("id", brief_id)
                 .eq("user_id", user_id)
+                .eq("analysis_results.user_id", user_id)
+                .order("created_at", desc=True, foreign_table="analysis_results")
+                .limit(1, foreign_table="analysis_results")
                 .single()
                 .execute()
             )
             if brief.data:
+                analyses = brief.data.pop("analysis_results", None) or []
                 result["brief"] = brief.data
-
-            # 3. Get analysis results
-            analysis = (
-                supabase.client.table("analysis_results")
-                .select("id, law_sections, case_histories, analysis, created_at")
-                .eq("brief_id", brief_id)
-                .eq("user_id", user_id)
-                .order("created_at", desc=True)
-                .limit(1)
-                .execute()
-            )
-            if analysis.data:
-                result["analysis"] = analysis.data[0]
+                if analyses:
+                    result["analysis"] = analyses[0]
 
         return jsonify(result), 200
     except Exception as e:
@@ -569,7 +820,7 @@ def user_history():
 
         query = (
             supabase.client.table("activity_log")
-            .select("id, action, title, detail, metadata, created_at")
+            .select(_ACTIVITY_COLUMNS)
             .eq("user_id", user_id)
             .order("created_at", desc=True)
             .range(offset, offset + limit - 1)
@@ -642,17 +893,6 @@ def update_folder(folder_id):
         return jsonify({"error": "Not authenticated"}), 401
     data = request.json or {}
     try:
-        existing = (
-            supabase.client.table("case_folders")
-            .select("id")
-            .eq("id", folder_id)
-            .eq("user_id", user_id)
-            .single()
-            .execute()
-        )
-        if not existing.data:
-            return jsonify({"error": "Folder not found"}), 404
-
         updates = {}
         if "name" in data:
             updates["name"] = data["name"].strip()
@@ -663,13 +903,18 @@ def update_folder(folder_id):
         if not updates:
             return jsonify({"error": "No fields to update"}), 400
 
+        # Ownership is part of the UPDATE filter — no separate pre-read;
+        # zero rows back means the folder is missing or not the caller's.
         row = (
             supabase.client.table("case_folders")
             .update(updates)
             .eq("id", folder_id)
+            .eq("user_id", user_id)
             .execute()
         )
-        return jsonify({"folder": row.data[0] if row.data else None}), 200
+        if not row.data:
+            return jsonify({"error": "Folder not found"}), 404
+        return jsonify({"folder": row.data[0]}), 200
     except Exception as e:
         logger.error("Update folder error: %s", e)
         return jsonify({"error": str(e)}), 500
@@ -682,22 +927,18 @@ def delete_folder(folder_id):
     if not user_id:
         return jsonify({"error": "Not authenticated"}), 401
     try:
-        existing = (
+        # Scoped to the caller, so the delete doubles as the ownership
+        # check.  Cases inside are un-filed by the folder_id foreign key
+        # (ON DELETE SET NULL, migration 006) in the same statement.
+        deleted = (
             supabase.client.table("case_folders")
-            .select("id")
+            .delete()
             .eq("id", folder_id)
             .eq("user_id", user_id)
-            .single()
             .execute()
         )
-        if not existing.data:
+        if not deleted.data:
             return jsonify({"error": "Folder not found"}), 404
-
-        # Un-file all cases in this folder
-        supabase.client.table("cases").update({"folder_id": None}).eq("folder_id", folder_id).execute()
-
-        # Delete the folder
-        supabase.client.table("case_folders").delete().eq("id", folder_id).execute()
         return jsonify({"status": "deleted", "folder_id": folder_id}), 200
     except Exception as e:
         logger.error("Delete folder error: %s", e)
@@ -720,7 +961,7 @@ def list_cases():
         type_filter = request.args.get("case_type")    # optional: civil, criminal, etc.
         query = (
             supabase.client.table("cases")
-            .select("id, title, status, notes, folder_id, case_type, created_at, updated_at")
+            .select(_CASE_COLUMNS)
             .eq("user_id", user_id)
             .order("updated_at", desc=True)
         )
@@ -773,65 +1014,47 @@ def get_case(case_id):
     if not user_id:
         return jsonify({"error": "Not authenticated"}), 401
     try:
-        # 1. Case metadata
-        case_row = (
+        # Case metadata, all briefs (chronological), their analyses and
+        # uploaded documents, and the activity log entries — every read is
+        # keyed on case_id, so all five run concurrently in one wave.
+        # Analyses reach the case through an inner-joined, column-less
+        # briefs embed (filter only; nothing extra in the rows).  Only the
+        # analysis document is read — the legacy law_sections /
+        # case_histories columns are never written and never rendered.
+        # Every query is scoped to user_id, so nothing leaks if the case
+        # turns out not to belong to the caller.
+        case_row, briefs, analysis_rows, document_rows, activities = _execute_parallel(
             supabase.client.table("cases")
-            .select("id, title, status, notes, folder_id, case_type, created_at, updated_at")
+            .select(_CASE_COLUMNS)
             .eq("id", case_id)
             .eq("user_id", user_id)
-            .single()
-            .execute()
-        )
-        if not case_row.data:
-            return jsonify({"error": "Case not found"}), 404
-
-        # 2. All briefs for this case (chronological)
-        briefs = (
+            .single(),
             supabase.client.table("briefs")
             .select("id, title, content, created_at")
             .eq("case_id", case_id)
             .eq("user_id", user_id)
-            .order("created_at", desc=False)
-            .execute()
-        )
-
-        # 3. All analysis results linked to these briefs
-        brief_ids = [b["id"] for b in (briefs.data or [])]
-        analyses = []
-        if brief_ids:
-            analysis_rows = (
-                supabase.client.table("analysis_results")
-                .select("id, brief_id, analysis, law_sections, case_histories, created_at")
-                .eq("user_id", user_id)
-                .in_("brief_id", brief_ids)
-                .order("created_at", desc=False)
-                .execute()
-            )
-            analyses = analysis_rows.data or []
-
-        # 3b. All uploaded case documents linked to these briefs
-        documents = []
-        if brief_ids:
-            document_rows = (
-                supabase.client.table("case_documents")
-                .select("id, brief_id, filename, document_type, document_title, language, metadata, created_at")
-                .eq("case_id", case_id)
-                .eq("user_id", user_id)
-                .in_("brief_id", brief_ids)
-                .order("created_at", desc=False)
-                .execute()
-            )
-            documents = document_rows.data or []
-
-        # 4. Activity log entries for this case
-        activities = (
+            .order("created_at", desc=False),
+            supabase.client.table("analysis_results")
+            .select("id, brief_id, analysis, created_at, briefs!inner()")
+            .eq("user_id", user_id)
+            .eq("briefs.case_id", case_id)
+            .order("created_at", desc=False),
+            supabase.client.table("case_documents")
+            .select("id, brief_id, filename, document_type, document_title, language, metadata, created_at")
+            .eq("case_id", case_id)
+            .eq("user_id", user_id)
+            .order("created_at", desc=False),
             supabase.client.table("activity_log")
             .select("id, action, title, detail, created_at")
             .eq("case_id", case_id)
             .eq("user_id", user_id)
-            .order("created_at", desc=False)
-            .execute()
+            .order("created_at", desc=False),
         )
+        if not case_row.data:
+            return jsonify({"error": "Case not found"}), 404
+
+        analyses = analysis_rows.data or []
+        documents = document_rows.data or []
 
         # Build timeline: merge briefs + analyses into entries
         timeline = []
@@ -839,21 +1062,20 @@ def get_case(case_id):
         for a in analyses:
             analysis_by_brief.setdefault(a["brief_id"], []).append(a)
 
-        document_by_brief = {}
-        for d in documents:
-            document_by_brief[d["brief_id"]] = d
+        document_by_brief = {d["brief_id"]: d for d in documents}
 
         for b in (briefs.data or []):
-            entry = {
-                "type": "document" if b["id"] in document_by_brief else "brief",
-                "brief_id": b["id"],
+            brief_id = b["id"]
+            document = document_by_brief.get(brief_id)
+            timeline.append({
+                "type": "document" if document is not None else "brief",
+                "brief_id": brief_id,
                 "title": b["title"],
                 "content": b["content"],
                 "created_at": b["created_at"],
-                "analyses": analysis_by_brief.get(b["id"], []),
-                "document": document_by_brief.get(b["id"]),
-            }
-            timeline.append(entry)
+                "analyses": analysis_by_brief.get(brief_id, []),
+                "document": document,
+            })
 
         return jsonify({
             "case": case_row.data,
@@ -873,24 +1095,12 @@ def update_case(case_id):
         return jsonify({"error": "Not authenticated"}), 401
     data = request.json or {}
     try:
-        # Verify ownership
-        existing = (
-            supabase.client.table("cases")
-            .select("id")
-            .eq("id", case_id)
-            .eq("user_id", user_id)
-            .single()
-            .execute()
-        )
-        if not existing.data:
-            return jsonify({"error": "Case not found"}), 404
-
         updates = {}
         if "title" in data:
             updates["title"] = data["title"]
         if "notes" in data:
             updates["notes"] = data["notes"]
-        if "status" in data and data["status"] in ("active", "closed", "archived"):
+        if "status" in data and data["status"] in _CASE_STATUSES:
             updates["status"] = data["status"]
         if "folder_id" in data:
             updates["folder_id"] = data["folder_id"] or None  # allow un-filing
@@ -900,18 +1110,78 @@ def update_case(case_id):
         if not updates:
             return jsonify({"error": "No fields to update"}), 400
 
+        # Ownership is part of the UPDATE filter — no separate pre-read;
+        # zero rows back means the case is missing or not the caller's.
         row = (
             supabase.client.table("cases")
             .update(updates)
             .eq("id", case_id)
+            .eq("user_id", user_id)
             .execute()
         )
-        return jsonify({"case": row.data[0] if row.data else None}), 200
+        if not row.data:
+            return jsonify({"error": "Case not found"}), 404
+        return jsonify({"case": row.data[0]}), 200
     except Exception as e:
         logger.error("Update case error: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
+# Leading markdown heading marks ("## ") on document titles used as brief labels
+_MD_HEADING_RE = re.compile(r'^#+\s*')
+
+# Max ids per in_() filter — ~37 URL bytes per uuid keeps a request well
+# under common proxy URL limits
+_IN_FILTER_CHUNK = 200
+
+
+def _delete_case_rows(case_id: str, user_id: str) -> bool:
+    """Delete a case and its briefs, analyses and activity entries.
+
+    The cascade runs in Postgres (``delete_case_cascade`` RPC, migration
+    010) so brief ids never make the round trip to the client and back.
+    If the function is unavailable, fall back to the client-side deletes.
+    Returns ``False`` when the case does not belong to the user.
+    """
+    res = _call_rpc("delete_case_cascade", {"p_case_id": case_id, "p_user_id": user_id})
+    if res is not None:
+        return bool(res.data)
+
+    # Verify ownership
+    existing = (
+        supabase.client.table("cases")
+        .select("id")
+        .eq("id", case_id)
+        .eq("user_id", user_id)
+        .single()
+        .execute()
+    )
+    if not existing.data:
+        return False
+
+    # Delete related records (order matters for FK constraints)
+    # 1. Delete analysis results linked to briefs in this case — in chunks,
+    #    since the id list travels in the request URL — together with the
+    #    case's activity log entries.  None of these depend on each other,
+    #    so they go out as one concurrent wave.
+    briefs = supabase.client.table("briefs").select("id").eq("case_id", case_id).execute()
+    brief_ids = [b["id"] for b in (briefs.data or [])]
+    _execute_parallel(
+        *(
+            supabase.client.table("analysis_results").delete().in_("brief_id", brief_ids[i:i + _IN_FILTER_CHUNK])
+            for i in range(0, len(brief_ids), _IN_FILTER_CHUNK)
+        ),
+        supabase.client.table("activity_log").delete().eq("case_id", case_id),
+    )
+
+    # 2. Delete briefs
+    supabase.client.table("briefs").delete().eq("case_id", case_id).execute()
+
+    # 3. Delete the case itself
+    supabase.client.table("cases").delete().eq("id", case_id).eq("user_id", user_id).execute()
+    return True
+
+
 @app.route("/api/cases/<case_id>", methods=["DELETE"])
 def delete_case(case_id):
     """Delete a case and all its related briefs, analyses, and activity log entries."""
@@ -919,34 +1189,9 @@ def delete_case(case_id):
     if not user_id:
         return jsonify({"error": "Not authenticated"}), 401
     try:
-        # Verify ownership
-        existing = (
-            supabase.client.table("cases")
-            .select("id")
-            .eq("id", case_id)
-            .eq("user_id", user_id)
-            .single()
-            .execute()
-        )
-        if not existing.data:
+        if not _delete_case_rows(case_id, user_id):
             return jsonify({"error": "Case not found"}), 404
 
-        # Delete related records (order matters for FK constraints)
-        # 1. Delete analysis results linked to briefs in this case
-        briefs = supabase.client.table("briefs").select("id").eq("case_id", case_id).execute()
-        brief_ids = [b["id"] for b in (briefs.data or [])]
-        if brief_ids:
-            supabase.client.table("analysis_results").delete().in_("brief_id", brief_ids).execute()
-
-        # 2. Delete briefs
-        supabase.client.table("briefs").delete().eq("case_id", case_id).execute()
-
-        # 3. Delete activity log entries for this case
-        supabase.client.table("activity_log").delete().eq("case_id", case_id).execute()
-
-        # 4. Delete the case itself
-        supabase.client.table("cases").delete().eq("id", case_id).eq("user_id", user_id).execute()
-
         logger.info("Case %s deleted by user %s", case_id, user_id)
         return jsonify({"status": "deleted", "case_id": case_id}), 200
     except Exception as e:
@@ -954,6 +1199,43 @@ def delete_case(case_id):
         return jsonify({"error": str(e)}), 500
 
 
+_PRIOR_ENTRY_CHARS = 1800  # Per-entry cap on prior briefs in the Claude context
+
+
+def _prior_brief_excerpts(case_id: str, user_id: str, exclude_id: str):
+    """Fetch up to 4 prior briefs of a case, most recent first.
+
+    ``content`` is the ``brief_excerpt`` computed column (migration 013) —
+    one character past the context cap, so callers can still tell the
+    text was cut — rather than the whole, possibly OCR-sized, brief.
+    If the function is not installed, fall back to the full column; any
+    other failure falls back for this request only.
+    """
+    def fetch(columns: str):
+        return (
+            supabase.client.table("briefs")
+            .select(columns)
+            .eq("case_id", case_id)
+            .eq("user_id", user_id)
+            .neq("id", exclude_id)          # exclude the entry just inserted
+            .order("created_at", desc=True)
+            .limit(4)
+            .execute()
+        )
+
+    if time.monotonic() >= _rpc_down_until.get("brief_excerpt", 0.0):
+        try:
+            return fetch("content:brief_excerpt, created_at")
+        except Exception as e:
+            if isinstance(e, APIError) and e.code in _RPC_MISSING_CODES:
+                _rpc_down_until["brief_excerpt"] = time.monotonic() + _RPC_RETRY_AFTER
+                logger.warning("brief_excerpt column not installed, using full content for %ds: %s",
+                               _RPC_RETRY_AFTER, e)
+            else:
+                logger.warning("brief_excerpt column failed, using full content: %s", e)
+    return fetch("content, created_at")
+
+
 @app.route("/api/cases/<case_id>/entry", methods=["POST"])
 def add_case_entry(case_id):
     """Add a new brief/note entry or document to an existing case, optionally with AI analysis.
@@ -990,29 +1272,33 @@ def add_case_entry(case_id):
         return jsonify({"error": "Entry text is required"}), 400
 
     try:
-        # Verify case ownership — fetch title, type, and notes for AI context
-        existing = (
+        # Verify case ownership — fetch title, type, and notes for AI context.
+        # The read runs while the upload is read in, and is checked before
+        # any (paid) extraction or write.
+        existing_future = _in_background(
             supabase.client.table("cases")
             .select("id, title, case_type, notes")
             .eq("id", case_id)
             .eq("user_id", user_id)
             .single()
-            .execute()
+            .execute
         )
-        if not existing.data:
-            return jsonify({"error": "Case not found"}), 404
 
-        # Initialize result and document info
-        document_id = None
+        # Initialize document info
         document_data = None
         file_data = None
         
-        # If file is uploaded, process it
         if is_file_upload and uploaded_file and uploaded_file.filename:
             file_data = uploaded_file.read()
             if len(file_data) == 0:
                 return jsonify({"error": "File is empty"}), 400
-            
+
+        existing = existing_future.result()
+        if not existing.data:
+            return jsonify({"error": "Case not found"}), 404
+
+        # If file is uploaded, process it
+        if file_data is not None:
             # Process document with DocumentService
             document_data = document_service.process_document(
                 file_data=file_data,
@@ -1023,7 +1309,7 @@ def add_case_entry(case_id):
             )
             
             if "error" in document_data:
-                status_code = 400 if document_data.get("status") in ("unsupported_format", "file_too_large", "empty_file") else 500
+                status_code = 400 if document_data.get("status") in _UPLOAD_CLIENT_ERRORS else 500
                 return jsonify(document_data), status_code
             
             # Extract document text and use it for analysis if no separate text was provided
@@ -1034,35 +1320,26 @@ def add_case_entry(case_id):
         if not text:
             return jsonify({"error": "Could not extract any usable text from the document. Please add a short note with the upload or try a clearer file."}), 400
 
-        # 1. Save brief entry to this case
+        # 1. Save the entry to this case, with the uploaded document's row
         # Strip leading markdown heading chars (e.g. "## Title") for the stored title label
-        import re as _re
         raw_title = (
             document_data.get("classification", {}).get("document_title")
             if document_data else text[:120].replace("\n", " ").strip()
         )
-        brief_title = _re.sub(r'^#+\s*', '', raw_title)[:100].strip()
-        brief_row = supabase.client.table("briefs").insert({
-            "user_id": user_id,
-            "case_id": case_id,
-            "title": brief_title,
-            "content": text,
-        }).execute()
-        brief_id = brief_row.data[0]["id"] if brief_row.data else None
+        brief_title = _MD_HEADING_RE.sub('', raw_title)[:100].strip()
 
-        # 2. If document was uploaded, save document metadata to case_documents table
-        if document_data and brief_id:
+        document = None
+        if document_data:
             classification = document_data.get("classification", {})
             metadata = document_data.get("metadata", {})
-            
-            doc_insert = {
-                "user_id": user_id,
-                "case_id": case_id,
-                "brief_id": brief_id,
+            # With no separate note the extracted text *is* the brief content,
+            # already stored on the linked brief — don't ship and store it twice.
+            doc_text = document_data.get("text", "")
+            document = {
                 "filename": uploaded_file.filename,
                 "file_size_bytes": len(file_data) if file_data else None,
                 "mime_type": uploaded_file.content_type if uploaded_file else None,
-                "extracted_text": document_data.get("text", ""),
+                "extracted_text": None if doc_text == text else doc_text,
                 "is_ocr": metadata.get("ocr_used", False),
                 "document_type": classification.get("document_type"),
                 "document_title": classification.get("document_title"),
@@ -1070,8 +1347,17 @@ def add_case_entry(case_id):
                 "language": document_data.get("language", "en"),
                 "metadata": metadata,
             }
-            doc_row = supabase.client.table("case_documents").insert(doc_insert).execute()
-            document_id = doc_row.data[0]["id"] if doc_row.data else None
+        brief_id, document_id = _save_case_entry(user_id, case_id, brief_title, text, document)
+        will_analyze = bool(run_analysis and claude.is_available and brief_id)
+
+        # Up to 4 prior brief entries for this case (most recent first) give
+        # Claude the case background.  The read only needs the new brief id,
+        # so it runs while the analysis context is assembled below.
+        prior_briefs_future = None
+        if will_analyze:
+            prior_briefs_future = _in_background(
+                _prior_brief_excerpts, case_id, user_id, brief_id,
+            )
 
         result = {
             "brief_id": brief_id,
@@ -1079,22 +1365,13 @@ def add_case_entry(case_id):
             "document_data": document_data,
             "analysis": None
         }
+        # Independent closing writes, sent together with the case touch below
+        writes = []
 
-        # 3. Optionally run AI analysis on the new entry
-        if run_analysis and claude.is_available and brief_id:
+        # 2. Optionally run AI analysis on the new entry
+        if will_analyze:
             # ── Build case context for Claude ──────────────────────────────
-            # Fetch up to 4 prior brief entries for this case (most recent first)
-            # so Claude understands the full case background, not just the new snippet.
-            prior_briefs_res = (
-                supabase.client.table("briefs")
-                .select("content, created_at")
-                .eq("case_id", case_id)
-                .eq("user_id", user_id)
-                .neq("id", brief_id)          # exclude the entry we just inserted
-                .order("created_at", desc=True)
-                .limit(4)
-                .execute()
-            )
+            prior_briefs_res = prior_briefs_future.result()
 
             case_info = existing.data
             case_title = case_info.get("title", "Untitled Case")
@@ -1116,8 +1393,8 @@ def add_case_entry(case_id):
                     entry_date = (entry.get("created_at") or "")[:10]
                     entry_content = entry.get("content", "")
                     # Truncate very long entries to avoid hitting token limits
-                    if len(entry_content) > 1800:
-                        entry_content = entry_content[:1800] + "\n[...truncated for brevity]"
+                    if len(entry_content) > _PRIOR_ENTRY_CHARS:
+                        entry_content = entry_content[:_PRIOR_ENTRY_CHARS] + "\n[...truncated for brevity]"
                     context_lines.append(
                         f"\n[Entry {idx} — {entry_date}]\n{entry_content}"
                     )
@@ -1146,14 +1423,15 @@ def add_case_entry(case_id):
                 "statutes_regex": regex_context.get("statutes", []),
                 "precedents_kanoon": regex_context.get("precedents", []),
             }
-            supabase.client.table("analysis_results").insert({
+            writes.append(supabase.client.table("analysis_results").insert({
                 "user_id": user_id,
                 "brief_id": brief_id,
                 "analysis": merged,
-            }).execute()
+            }))
             result["analysis"] = merged
 
-        # 4. Log activity
+        # 3. Log activity (one timestamp shared with the case touch below)
+        now = datetime.now(timezone.utc).isoformat()
         snippet = text[:200].replace("\n", " ")
         if document_data:
             action = "document_uploaded_to_case_analyzed" if run_analysis else "document_uploaded_to_case"
@@ -1163,23 +1441,24 @@ def add_case_entry(case_id):
             action = "ai_brief_analyzed" if run_analysis else "brief_analyzed"
             title = f"Entry: {existing.data['title'][:50]}"
         
-        supabase.client.table("activity_log").insert({
-            "user_id": user_id,
-            "case_id": case_id,
-            "action": action,
-            "title": title,
-            "detail": snippet,
-            "metadata": {
+        activity_logger.log(
+            user_id, action,
+            title=title,
+            detail=snippet,
+            metadata={
                 "brief_id": brief_id,
                 "case_id": case_id,
                 "document_id": document_id,
                 "document_type": document_data.get("classification", {}).get("document_type") if document_data else None,
             },
-        }).execute()
+            case_id=case_id,
+            created_at=now,
+        )
 
-        # Touch the case updated_at
-        from datetime import datetime, timezone
-        supabase.client.table("cases").update({"updated_at": datetime.now(timezone.utc).isoformat()}).eq("id", case_id).execute()
+        # Touch the case updated_at — in one concurrent wave with the
+        # analysis insert, which nothing else here waits on
+        writes.append(supabase.client.table("cases").update({"updated_at": now}).eq("id", case_id))
+        _execute_parallel(*writes)
 
         return jsonify(result), 201
     except Exception as e:
@@ -1189,6 +1468,16 @@ def add_case_entry(case_id):
 # AI – Claude-powered endpoints
 # ---------------------------------------------------------------------------
 
+def _sse_event(payload: dict, **kwargs) -> str:
+    """Format one Server-Sent Event.
+
+    Encoded through ``app.json`` (orjson when installed) — the chat and
+    draft streams emit one event per model token chunk, so this runs in
+    the innermost loop of every streaming response.
+    """
+    return f"data: {app.json.dumps(payload, **kwargs)}\n\n"
+
+
 @app.route("/api/ai/analyze", methods=["POST"])
 def ai_analyze():
     """Deep AI analysis of a legal brief using Claude.
@@ -1250,6 +1539,7 @@ def ai_analyze():
         if supabase.client:
             try:
                 # Auto-create a case if none specified
+                case_title = ""
                 if not case_id:
                     case_title = text[:100].replace("\n", " ").strip()
                     # Use AI-generated summary as title if available
@@ -1262,37 +1552,20 @@ def ai_analyze():
                             case_title = text[:100].replace("\n", " ").strip()
                         else:
                             case_title = clean[:120]
-                    case_row = supabase.client.table("cases").insert({
-                        "user_id": user_id,
-                        "title": case_title,
-                        "status": "active",
-                    }).execute()
-                    case_id = case_row.data[0]["id"] if case_row.data else None
-
-                brief_row = supabase.client.table("briefs").insert({
-                    "user_id": user_id,
-                    "case_id": case_id,
-                    "title": text[:100].replace("\n", " ").strip(),
-                    "content": text,
-                }).execute()
-                brief_id = brief_row.data[0]["id"] if brief_row.data else None
-
-                if brief_id:
-                    supabase.client.table("analysis_results").insert({
-                        "user_id": user_id,
-                        "brief_id": brief_id,
-                        "analysis": merged,
-                    }).execute()
+
+                case_id, brief_id = _save_brief_analysis(
+                    user_id, case_id, case_title, _case_type_code(regex_context),
+                    text, merged,
+                )
 
                 snippet = text[:200].replace("\n", " ")
-                supabase.client.table("activity_log").insert({
-                    "user_id": user_id,
-                    "case_id": case_id,
-                    "action": "ai_brief_analyzed",
-                    "title": "AI Brief Analysis",
-                    "detail": snippet,
-                    "metadata": {"brief_id": brief_id, "case_id": case_id},
-                }).execute()
+                activity_logger.log(
+                    user_id, "ai_brief_analyzed",
+                    title="AI Brief Analysis",
+                    detail=snippet,
+                    metadata={"brief_id": brief_id, "case_id": case_id},
+                    case_id=case_id,
+                )
             except Exception as log_err:
                 logger.warning("Activity log write failed: %s", log_err)
 
@@ -1334,10 +1607,10 @@ def ai_analyze_stream():
     def generate():
         try:
             # Emit initial progress
-            yield f"data: {json.dumps({'type': 'progress', 'step': 'start', 'message': 'Starting analysis pipeline...', 'pct': 5})}\n\n"
+            yield _sse_event({'type': 'progress', 'step': 'start', 'message': 'Starting analysis pipeline...', 'pct': 5})
 
             # Step 1: Regex extraction
-            yield f"data: {json.dumps({'type': 'progress', 'step': 'regex', 'message': 'Extracting entities, statutes & precedents...', 'pct': 8})}\n\n"
+            yield _sse_event({'type': 'progress', 'step': 'regex', 'message': 'Extracting entities, statutes & precedents...', 'pct': 8})
             try:
                 regex_context = analyzer.analyze(text)
             except Exception as regex_err:
@@ -1354,7 +1627,7 @@ def ai_analyze_stream():
             # This is compatible with both sync and gevent gunicorn workers.
             # The tradeoff: no granular mid-pass progress events, but no
             # threading/queue that can be killed by the arbiter's SIGABRT.
-            yield f"data: {json.dumps({'type': 'progress', 'step': 'analyzing', 'message': 'AI analysis in progress — this may take 30-90 seconds...', 'pct': 15})}\n\n"
+            yield _sse_event({'type': 'progress', 'step': 'analyzing', 'message': 'AI analysis in progress — this may take 30-90 seconds...', 'pct': 15})
 
             ai_result = claude.analyze_brief(text, context=regex_context, deep=deep)
 
@@ -1363,10 +1636,10 @@ def ai_analyze_stream():
 
             # Check if Claude returned an error
             if ai_result.get("status") == "error":
-                yield f"data: {json.dumps({'type': 'error', 'error': ai_result.get('error', 'AI analysis failed')})}\n\n"
+                yield _sse_event({'type': 'error', 'error': ai_result.get('error', 'AI analysis failed')})
                 return
 
-            yield f"data: {json.dumps({'type': 'progress', 'step': 'merging', 'message': 'Merging results & saving to case diary...', 'pct': 97})}\n\n"
+            yield _sse_event({'type': 'progress', 'step': 'merging', 'message': 'Merging results & saving to case diary...', 'pct': 97})
 
             # Merge: AI analysis + regex-extracted entities + jurisdiction
             merged = {
@@ -1387,6 +1660,7 @@ def ai_analyze_stream():
             case_id = data.get("case_id")
             if supabase.client:
                 try:
+                    case_title = ""
                     if not case_id:
                         case_title = text[:100].replace("\n", " ").strip()
                         ai_summary = ai_result.get("case_summary", "")
@@ -1394,37 +1668,20 @@ def ai_analyze_stream():
                             clean = ai_summary.strip().lstrip("`").lstrip("json").strip()
                             if not clean.startswith("{"):
                                 case_title = clean[:120]
-                        case_row = supabase.client.table("cases").insert({
-                            "user_id": user_id,
-                            "title": case_title,
-                            "status": "active",
-                        }).execute()
-                        case_id = case_row.data[0]["id"] if case_row.data else None
 
-                    brief_row = supabase.client.table("briefs").insert({
-                        "user_id": user_id,
-                        "case_id": case_id,
-                        "title": text[:100].replace("\n", " ").strip(),
-                        "content": text,
-                    }).execute()
-                    brief_id = brief_row.data[0]["id"] if brief_row.data else None
-
-                    if brief_id:
-                        supabase.client.table("analysis_results").insert({
-                            "user_id": user_id,
-                            "brief_id": brief_id,
-                            "analysis": merged,
-                        }).execute()
+                    case_id, brief_id = _save_brief_analysis(
+                        user_id, case_id, case_title, _case_type_code(regex_context),
+                        text, merged,
+                    )
 
                     snippet = text[:200].replace("\n", " ")
-                    supabase.client.table("activity_log").insert({
-                        "user_id": user_id,
-                        "case_id": case_id,
-                        "action": "ai_brief_analyzed",
-                        "title": "AI Brief Analysis",
-                        "detail": snippet,
-                        "metadata": {"brief_id": brief_id, "case_id": case_id},
-                    }).execute()
+                    activity_logger.log(
+                        user_id, "ai_brief_analyzed",
+                        title="AI Brief Analysis",
+                        detail=snippet,
+                        metadata={"brief_id": brief_id, "case_id": case_id},
+                        case_id=case_id,
+                    )
                 except Exception as log_err:
                     logger.warning("Activity log write failed: %s", log_err)
 
@@ -1432,11 +1689,12 @@ def ai_analyze_stream():
             merged["brief_id"] = brief_id
 
             # Final result event
-            yield f"data: {json.dumps({'type': 'result', 'data': merged}, default=str)}\n\n"
+            # Full analysis payload — the large one
+            yield _sse_event({'type': 'result', 'data': merged}, default=str)
 
         except Exception as e:
             logger.error("AI analysis stream error: %s", e)
-            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+            yield _sse_event({'type': 'error', 'error': str(e)})
 
     return Response(
         stream_with_context(generate()),
@@ -1475,24 +1733,15 @@ def ai_chat():
         try:
             for chunk in claude.chat_stream(messages, brief_context=brief_context):
                 # SSE format
-                yield f"data: {json.dumps({'type': 'chunk', 'text': chunk})}\n\n"
-            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+                yield _sse_event({'type': 'chunk', 'text': chunk})
+            yield _sse_event({'type': 'done'})
         except Exception as e:
             logger.error("Chat streaming error: %s", e)
-            yield f"data: {json.dumps({'type': 'error', 'text': str(e)})}\n\n"
+            yield _sse_event({'type': 'error', 'text': str(e)})
 
     # Log activity
-    if supabase.client:
-        try:
-            last_msg = messages[-1].get("content", "")[:200] if messages else ""
-            supabase.client.table("activity_log").insert({
-                "user_id": user_id,
-                "action": "ai_chat",
-                "title": "AI Chat",
-                "detail": last_msg,
-            }).execute()
-        except Exception:
-            pass
+    last_msg = messages[-1].get("content", "")[:200] if messages else ""
+    activity_logger.log(user_id, "ai_chat", title="AI Chat", detail=last_msg)
 
     return Response(
         stream_with_context(generate()),
@@ -1527,23 +1776,19 @@ def ai_draft():
     def generate():
         try:
             for chunk in claude.draft_document(doc_type, details, brief_context):
-                yield f"data: {json.dumps({'type': 'chunk', 'text': chunk})}\n\n"
-            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+                yield _sse_event({'type': 'chunk', 'text': chunk})
+            yield _sse_event({'type': 'done'})
         except Exception as e:
             logger.error("Document draft error: %s", e)
-            yield f"data: {json.dumps({'type': 'error', 'text': str(e)})}\n\n"
+            yield _sse_event({'type': 'error', 'text': str(e)})
 
     # Log activity
-    if supabase.client:
-        try:
-            supabase.client.table("activity_log").insert({
-                "user_id": user_id,
-                "action": "document_drafted",
-                "title": f"Draft: {doc_type}",
-                "detail": json.dumps(details)[:200],
-            }).execute()
-        except Exception:
-            pass
+    activity_logger.log(
+        user_id, "document_drafted",
+        title=f"Draft: {doc_type}",
+        detail=json.dumps(details)[:200],
+        metadata={"doc_type": doc_type, "details": details},
+    )
 
     return Response(
         stream_with_context(generate()),
@@ -1563,7 +1808,7 @@ def ai_draft():
 def _run_deep_dive(user_id: str, brief_id: str, case_id: str, text: str):
     """Background task: run thorough multi-pass Sonnet analysis and update the case diary.
 
-    Runs in a daemon thread (gevent greenlet on Railway).
+    Runs on _deep_dive_pool (gevent greenlets on Railway).
     Reads the brief text, performs deep=True analysis, and UPDATEs the existing
     analysis_results row so the frontend sees the enriched result on next poll.
     """
@@ -1630,17 +1875,13 @@ def _run_deep_dive(user_id: str, brief_id: str, case_id: str, text: str):
                         pass
 
                 # Log activity
-                try:
-                    supabase.client.table("activity_log").insert({
-                        "user_id": user_id,
-                        "case_id": case_id,
-                        "action": "deep_dive_completed",
-                        "title": "Deep Analysis Complete",
-                        "detail": "Multi-pass AI analysis with citation verification completed.",
-                        "metadata": {"brief_id": brief_id, "case_id": case_id},
-                    }).execute()
-                except Exception:
-                    pass
+                activity_logger.log(
+                    user_id, "deep_dive_completed",
+                    title="Deep Analysis Complete",
+                    detail="Multi-pass AI analysis with citation verification completed.",
+                    metadata={"brief_id": brief_id, "case_id": case_id},
+                    case_id=case_id,
+                )
 
             _deep_dive_tasks[brief_id] = "complete"
             logger.info("Deep dive completed for brief %s (pipeline: %s, time: %ss)",
@@ -1657,9 +1898,10 @@ def _run_deep_dive(user_id: str, brief_id: str, case_id: str, text: str):
 def ai_deep_dive():
     """Trigger a background deep-dive analysis for an existing brief.
 
-    Returns 202 immediately. The analysis runs in a background thread and
+    Returns 202 immediately. The analysis runs on the deep-dive pool and
     updates the analysis_results row when complete. Frontend polls the
-    status endpoint to detect completion.
+    status endpoint to detect completion. Returns 503 when the deep-dive
+    backlog is full.
 
     Body: { "brief_id": "...", "case_id": "..." }
     """
@@ -1698,18 +1940,38 @@ def ai_deep_dive():
         logger.error("Deep dive brief fetch error: %s", e)
         return jsonify({"error": f"Failed to fetch brief: {e}"}), 500
 
-    # Launch background deep analysis
+    # Checked again with nothing in between that could yield: a concurrent
+    # request for the same brief may have queued it during the fetch above.
+    if _deep_dive_tasks.get(brief_id) == "running":
+        return jsonify({"status": "already_running", "brief_id": brief_id}), 200
+    if not _deep_dive_slots.acquire(blocking=False):
+        logger.warning("Deep dive backlog full (%d) — rejecting brief %s",
+                       _DEEP_DIVE_MAX_PENDING, brief_id)
+        return jsonify({"error": "Deep analysis is busy, please try again shortly"}), 503
+
+    # Launch background deep analysis (queued if the pool is busy — the
+    # status stays "running" until it finishes)
     _deep_dive_tasks[brief_id] = "running"
-    t = threading.Thread(
-        target=_run_deep_dive,
-        args=(user_id, brief_id, case_id, text),
-        daemon=True,
-    )
-    t.start()
+    future = _deep_dive_pool.submit(_run_deep_dive, user_id, brief_id, case_id, text)
+    future.add_done_callback(lambda _: _deep_dive_slots.release())
 
     return jsonify({"status": "started", "brief_id": brief_id}), 202
 
 
+def _latest_analysis(brief_id: str, user_id: str) -> dict | None:
+    """The newest analysis blob for a brief (only that row is fetched)."""
+    result = (
+        supabase.client.table("analysis_results")
+        .select("analysis")
+        .eq("brief_id", brief_id)
+        .eq("user_id", user_id)
+        .order("created_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    return result.data[0]["analysis"] if result.data else None
+
+
 @app.route("/api/ai/deep-dive-status/<brief_id>", methods=["GET"])
 def deep_dive_status(brief_id):
     """Check the status of a background deep-dive analysis.
@@ -1729,16 +1991,7 @@ def deep_dive_status(brief_id):
     if status == "complete":
         # Fetch the updated analysis from DB
         try:
-            result = (
-                supabase.client.table("analysis_results")
-                .select("analysis")
-                .eq("brief_id", brief_id)
-                .eq("user_id", user_id)
-                .order("created_at", desc=True)
-                .limit(1)
-                .execute()
-            )
-            analysis = result.data[0]["analysis"] if result.data else None
+            analysis = _latest_analysis(brief_id, user_id)
         except Exception:
             analysis = None
 
@@ -1754,19 +2007,29 @@ def deep_dive_status(brief_id):
         return jsonify({"status": "error"}), 200
 
     else:
-        # Check DB — maybe server restarted and task completed previously
+        # Check DB — maybe server restarted, or the task ran in another
+        # worker, and it completed previously.  Until it has, this branch
+        # serves every poll, so only the newest row's deep_dive flag is
+        # read; the full analysis blob is fetched once the flag is set.
         try:
-            result = (
+            latest = (
                 supabase.client.table("analysis_results")
-                .select("analysis")
+                .select("id, deep_dive:analysis->deep_dive")
                 .eq("brief_id", brief_id)
                 .eq("user_id", user_id)
+                .order("created_at", desc=True)
+                .limit(1)
                 .execute()
             )
-            if result.data:
-                analysis = result.data[0]["analysis"]
-                if analysis and analysis.get("deep_dive"):
-                    return jsonify({"status": "complete", "analysis": analysis}), 200
+            if latest.data and latest.data[0].get("deep_dive"):
+                row = (
+                    supabase.client.table("analysis_results")
+                    .select("analysis")
+                    .eq("id", latest.data[0]["id"])
+                    .single()
+                    .execute()
+                )
+                return jsonify({"status": "complete", "analysis": row.data["analysis"]}), 200
         except Exception:
             pass
 
@@ -1783,7 +2046,10 @@ def _require_super_admin():
     if not user_id:
         return None, None, jsonify({"error": "Not authenticated"}), 401
     admin_info = _is_admin(email)
-    # Also check profiles table for role
+    # Roster admins never need the profiles round trip
+    if admin_info and admin_info.get("role") == "super_admin":
+        return user_id, email, None, None
+    # Otherwise check profiles table for role
     role = None
     try:
         profile = supabase.client.table("profiles").select("role").eq("user_id", user_id).single().execute()
@@ -1791,7 +2057,7 @@ def _require_super_admin():
             role = profile.data.get("role")
     except Exception:
         pass
-    if (admin_info and admin_info.get("role") == "super_admin") or role == "super_admin":
+    if role == "super_admin":
         return user_id, email, None, None
     return None, None, jsonify({"error": "Super admin access required"}), 403
 
@@ -1824,7 +2090,7 @@ def admin_create_user():
     role = data.get("role", "user")
     if not new_email or not full_name:
         return jsonify({"error": "Email and full name are required"}), 400
-    if role not in ("user", "admin", "super_admin"):
+    if role not in _USER_ROLES:
         return jsonify({"error": "Invalid role"}), 400
     if not phone:
         return jsonify({"error": "Phone number is required (used for login)"}), 400
@@ -1878,7 +2144,7 @@ def admin_update_user(user_id_param):
         if "phone" in data:
             update_data["phone"] = data["phone"].strip() or None
         if "role" in data:
-            if data["role"] not in ("user", "admin", "super_admin"):
+            if data["role"] not in _USER_ROLES:
                 return jsonify({"error": "Invalid role"}), 400
             update_data["role"] = data["role"]
         if "address" in data:
@@ -1958,22 +2224,27 @@ def admin_seed_profiles():
             if hasattr(u, 'email') and u.email:
                 auth_map[u.email.lower()] = u.id
 
+        # Collect every admin's profile row, then write them in one bulk upsert
+        rows = []
         for email_key, info in ADMIN_USERS.items():
             uid = auth_map.get(email_key)
             if not uid:
                 results.append({"email": email_key, "status": "not_in_auth", "detail": "Run setup-admins first"})
                 continue
+            rows.append({
+                "user_id": uid,
+                "full_name": info["name"],
+                "email": email_key,
+                "phone": info.get("phone"),
+                "role": info["role"],
+            })
+
+        if rows:
             try:
-                supabase.client.table("profiles").upsert({
-                    "user_id": uid,
-                    "full_name": info["name"],
-                    "email": email_key,
-                    "phone": info.get("phone"),
-                    "role": info["role"],
-                }).execute()
-                results.append({"email": email_key, "status": "seeded", "user_id": uid})
+                supabase.client.table("profiles").upsert(rows).execute()
+                results.extend({"email": r["email"], "status": "seeded", "user_id": r["user_id"]} for r in rows)
             except Exception as pe:
-                results.append({"email": email_key, "status": "error", "detail": str(pe)})
+                results.extend({"email": r["email"], "status": "error", "detail": str(pe)} for r in rows)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -2064,23 +2335,19 @@ def speech_transcribe():
         )
 
         # Log activity
-        if user_id and supabase.client and result.get("metadata", {}).get("status") == "success":
-            try:
-                snippet = (result.get("corrected_transcript") or result.get("raw_transcript", ""))[:200]
-                supabase.client.table("activity_log").insert({
-                    "user_id": user_id,
-                    "action": "speech_transcribed",
-                    "title": "Voice Dictation",
-                    "detail": snippet,
-                    "metadata": {
-                        "word_count": result.get("metadata", {}).get("word_count", 0),
-                        "corrections_count": result.get("metadata", {}).get("corrections_count", 0),
-                        "mode": mode,
-                        "role": user_role,
-                    },
-                }).execute()
-            except Exception as log_err:
-                logger.warning("Speech activity log failed: %s", log_err)
+        if result.get("metadata", {}).get("status") == "success":
+            snippet = (result.get("corrected_transcript") or result.get("raw_transcript", ""))[:200]
+            activity_logger.log(
+                user_id, "speech_transcribed",
+                title="Voice Dictation",
+                detail=snippet,
+                metadata={
+                    "word_count": result.get("metadata", {}).get("word_count", 0),
+                    "corrections_count": result.get("metadata", {}).get("corrections_count", 0),
+                    "mode": mode,
+                    "role": user_role,
+                },
+            )
 
         if "error" in result:
             return jsonify(result), 400 if result.get("status") in ("invalid_format", "file_too_large") else 500
@@ -2182,31 +2449,27 @@ def document_scan():
         )
 
         # Log activity
-        if user_id and supabase.client and result.get("metadata", {}).get("status") == "success":
-            try:
-                doc_type = result.get("classification", {}).get("document_type", "unknown")
-                doc_title = result.get("classification", {}).get("document_title", uploaded_file.filename)
-                snippet = (result.get("text") or "")[:200]
-
-                supabase.client.table("activity_log").insert({
-                    "user_id": user_id,
-                    "case_id": case_id,
-                    "action": "document_scanned",
-                    "title": f"Document Scan: {doc_title}",
-                    "detail": snippet,
-                    "metadata": {
-                        "filename": uploaded_file.filename,
-                        "document_type": doc_type,
-                        "word_count": result.get("metadata", {}).get("word_count", 0),
-                        "pages": result.get("pages", 0),
-                        "ocr_used": result.get("metadata", {}).get("ocr_used", False),
-                    },
-                }).execute()
-            except Exception as log_err:
-                logger.warning("Document scan activity log failed: %s", log_err)
+        if result.get("metadata", {}).get("status") == "success":
+            doc_type = result.get("classification", {}).get("document_type", "unknown")
+            doc_title = result.get("classification", {}).get("document_title", uploaded_file.filename)
+            snippet = (result.get("text") or "")[:200]
+
+            activity_logger.log(
+                user_id, "document_scanned",
+                title=f"Document Scan: {doc_title}",
+                detail=snippet,
+                metadata={
+                    "filename": uploaded_file.filename,
+                    "document_type": doc_type,
+                    "word_count": result.get("metadata", {}).get("word_count", 0),
+                    "pages": result.get("pages", 0),
+                    "ocr_used": result.get("metadata", {}).get("ocr_used", False),
+                },
+                case_id=case_id,
+            )
 
         if "error" in result:
-            status_code = 400 if result.get("status") in ("unsupported_format", "file_too_large", "empty_file") else 500
+            status_code = 400 if result.get("status") in _UPLOAD_CLIENT_ERRORS else 500
             return jsonify(result), status_code
 
         return jsonify(result)
@@ -457,6 +457,20 @@ STATUTES = {
 }
 
 
+# Flat section → [(act_key, prompt_line), ...] index, in STATUTES order.
+# Built once at import so lookups are a single dict get per section instead
+# of a probe into every act; the prompt line is pre-formatted too.
+_SECTION_INDEX = {}
+for _act_key, _act_data in STATUTES.items():
+    _replaced = _act_data.get("replaced_by")
+    for _sec, _text in _act_data["sections"].items():
+        _line = f"• {_act_key} S.{_sec}: {_text}"
+        if _replaced:
+            _line += f"  [⚠ Replaced by {_replaced}]"
+        _SECTION_INDEX.setdefault(_sec, []).append((_act_key, _line))
+del _act_key, _act_data, _replaced, _sec, _text, _line
+
+
 def lookup_sections(section_numbers: list, acts_mentioned: list = None) -> str:
     """Look up section text for given section numbers across relevant acts.
 
@@ -464,22 +478,14 @@ def lookup_sections(section_numbers: list, acts_mentioned: list = None) -> str:
     If *acts_mentioned* is provided, only those acts are searched;
     otherwise all acts are checked.
     """
-    results = []
-    search_acts = STATUTES
+    search_acts = None
     if acts_mentioned:
-        search_acts = {k: v for k, v in STATUTES.items() if k in acts_mentioned}
-        if not search_acts:
-            search_acts = STATUTES
+        search_acts = {k for k in STATUTES if k in acts_mentioned} or None
 
+    results = []
     for sec in section_numbers:
-        sec_str = str(sec).strip()
-        for act_key, act_data in search_acts.items():
-            if sec_str in act_data["sections"]:
-                text = act_data["sections"][sec_str]
-                replaced = act_data.get("replaced_by")
-                line = f"• {act_key} S.{sec_str}: {text}"
-                if replaced:
-                    line += f"  [⚠ Replaced by {replaced}]"
+        for act_key, line in _SECTION_INDEX.get(str(sec).strip(), ()):
+            if search_acts is None or act_key in search_acts:
                 results.append(line)
 
     return "\n".join(results) if results else ""
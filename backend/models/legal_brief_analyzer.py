@@ -17,7 +17,11 @@ All heavy NLP lives in InLegalBERTProcessor; this class orchestrates the
 full pipeline and returns a single JSON-serialisable dict.
 """
 
+import heapq
 import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 from typing import Any, Dict, List, Optional
 from backend.utils.logger import setup_logger
 
@@ -79,6 +83,9 @@ INDIAN_ACTS = {
     "Motor Vehicles Act": "Motor Vehicles Act, 1988",
 }
 
+# (short_name, full_name, lowercase short_name) — lowered once, not per brief
+_INDIAN_ACTS_LOWER = tuple((k, v, k.lower()) for k, v in INDIAN_ACTS.items())
+
 CASE_TYPES = [
     "Criminal",
     "Civil",
@@ -145,6 +152,153 @@ FIR_PATTERN = re.compile(
     re.IGNORECASE
 )
 
+# Keyword evidence for the rule-based case type classifier
+CASE_TYPE_KEYWORDS = MappingProxyType({
+    "Criminal": ("fir", "accused", "offence", "crime", "bail", "arrest",
+                 "prosecution", "charge sheet", "cognizable", "ipc", "bns",
+                 "crpc", "bnss", "murder", "theft", "robbery", "fraud",
+                 "cheating", "assault", "kidnap"),
+    "Civil": ("suit", "plaintiff", "defendant", "decree", "injunction",
+              "damages", "specific performance", "partition", "declaration",
+              "civil suit", "cpc"),
+    "Constitutional / Writ": ("writ", "fundamental right", "article 14",
+                               "article 19", "article 21", "article 32",
+                               "article 226", "habeas corpus", "mandamus",
+                               "certiorari", "prohibition", "quo warranto",
+                               "constitution"),
+    "Family / Matrimonial": ("divorce", "maintenance", "custody", "marriage",
+                              "matrimonial", "alimony", "domestic violence",
+                              "dowry", "hindu marriage", "muslim law",
+                              "guardianship", "child support"),
+    "Labour / Industrial": ("employee", "employer", "industrial dispute",
+                             "retrenchment", "workman", "wages", "gratuity",
+                             "provident fund", "termination", "labour"),
+    "Consumer": ("consumer", "deficiency", "service", "unfair trade",
+                  "goods", "complaint", "consumer forum", "ncdrc"),
+    "Commercial / Corporate": ("company", "shareholder", "director",
+                                "insolvency", "nclt", "winding up",
+                                "debenture", "merger", "acquisition"),
+    "Property / Land": ("property", "land", "possession", "title",
+                         "encroachment", "easement", "partition",
+                         "registration", "mutation", "revenue"),
+    "Motor Accident Claims": ("motor accident", "mact", "compensation",
+                               "vehicle", "accident", "injury",
+                               "motor vehicles act"),
+    "Arbitration": ("arbitration", "arbitral", "award", "arbitrator",
+                    "conciliation"),
+})
+
+_CASE_TYPE_KEYWORD_SETS = MappingProxyType({t: frozenset(kws) for t, kws in CASE_TYPE_KEYWORDS.items()})
+_ALL_CASE_TYPE_KEYWORDS = frozenset().union(*_CASE_TYPE_KEYWORD_SETS.values())
+
+# Keyword evidence for courts, in priority order (first listed wins)
+JURISDICTION_KEYWORDS = MappingProxyType({
+    "Supreme Court of India": ("supreme court", "hon'ble supreme", "sci"),
+    "High Court": ("high court", "hon'ble high court"),
+    "District Court": ("district court", "district judge"),
+    "Sessions Court": ("sessions court", "sessions judge"),
+    "Magistrate Court": ("magistrate", "jmfc", "cjm", "acjm"),
+    "Family Court": ("family court",),
+    "Consumer Forum / Commission": ("consumer forum", "consumer commission",
+                                      "ncdrc", "scdrc", "dcdrc"),
+    "NCLT": ("nclt", "company law tribunal"),
+    "NGT": ("ngt", "green tribunal"),
+    "MACT": ("mact", "motor accident", "claims tribunal"),
+})
+
+# One alternation with a named group per court (c0, c1, ...). Wrapped in a
+# lookahead so overlapping keywords are all seen, matching substring semantics.
+_JURISDICTION_COURTS = tuple(JURISDICTION_KEYWORDS)
+_JURISDICTION_PATTERN = re.compile("(?=" + "|".join(
+    f"(?P<c{i}>" + "|".join(re.escape(kw) for kw in keywords) + ")"
+    for i, keywords in enumerate(JURISDICTION_KEYWORDS.values())
+) + ")")
+# Group name → court priority, resolved once here instead of parsed per match
+_JURISDICTION_GROUP_RANK = MappingProxyType({
+    f"c{i}": i for i in range(len(_JURISDICTION_COURTS))
+})
+
+# Explicitly framed legal questions in the brief → issue source label
+_ISSUE_INDICATORS = (
+    (re.compile(r'whether\s+(.+?)(?:\.|$)'), 'framed_question'),
+    (re.compile(r'the\s+(?:main|primary|key|central)\s+issue\s+(?:is|was)\s+(.+?)(?:\.|$)'), 'stated_issue'),
+    (re.compile(r'question\s+(?:of|regarding)\s+(.+?)(?:\.|$)'), 'question_of'),
+)
+_CLAUSE_SPLIT_RE = re.compile(r'[.;]')            # timeline: one event per clause
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')  # summary: sentence boundaries
+
+# ── Strategy reference tables ──────────────────────────────────────
+# Read-only views: shared by every analysis, never rebuilt per call.
+
+# Type-specific arguments for the strategic analysis
+STRATEGY_ARGUMENTS = MappingProxyType({
+    "Criminal": (
+        "Challenge the legality of arrest / FIR if procedural irregularities exist.",
+        "Examine whether ingredients of the alleged offence are made out.",
+        "Consider bail application if the accused is in custody."
+    ),
+    "Civil": (
+        "Establish cause of action with documentary evidence.",
+        "Check limitation period under the Limitation Act, 1963.",
+        "Consider interim relief / injunction to protect rights during pendency."
+    ),
+    "Constitutional / Writ": (
+        "Demonstrate violation of fundamental rights with specificity.",
+        "Establish locus standi of the petitioner.",
+        "Show that no alternative efficacious remedy is available."
+    ),
+    "Family / Matrimonial": (
+        "Consider mediation / alternate dispute resolution as mandated by the court.",
+        "Gather evidence of cruelty / desertion as applicable.",
+        "Assess maintenance and custody rights carefully."
+    ),
+    "Consumer": (
+        "Establish deficiency in service or defect in goods with evidence.",
+        "File within the limitation period (2 years from cause of action).",
+        "Claim appropriate compensation and costs."
+    ),
+})
+
+# Evidence every matter needs, then evidence by case type
+BASE_EVIDENCE = ("Signed Vakalatnama", "Court fee stamp papers", "Identity proof of parties")
+EVIDENCE_CHECKLIST = MappingProxyType({
+    "Criminal": ("Copy of FIR", "Charge sheet", "Bail application",
+                  "Medical / forensic reports", "Witness statements"),
+    "Civil": ("Original contracts / agreements", "Property documents",
+               "Correspondence / notices", "Valuation reports"),
+    "Constitutional / Writ": ("Government orders under challenge",
+                               "Representation letters sent",
+                               "Constitutional provision analysis"),
+    "Family / Matrimonial": ("Marriage certificate", "Income proof",
+                              "Evidence of cruelty / desertion",
+                              "Children's school records"),
+    "Property / Land": ("Title deed", "Survey records", "Mutation entries",
+                         "Tax receipts", "Encumbrance certificate"),
+    "Consumer": ("Purchase invoice / receipt", "Warranty documents",
+                  "Complaint letters", "Expert opinion on defect"),
+    "Motor Accident Claims": ("FIR / accident report", "Medical bills",
+                               "Disability certificate", "Income proof",
+                               "Vehicle registration / insurance"),
+})
+
+# Procedural next steps common to every case type
+NEXT_STEPS = (
+    "1. Finalise and verify all facts with the client",
+    "2. Draft the petition / complaint / suit",
+    "3. Arrange supporting documents and evidence",
+    "4. File before the appropriate forum with court fee",
+    "5. Serve notice on opposite party as required",
+)
+
+# Indian Kanoon calls made while searching precedents (the relevance and
+# recent searches, then the full-text excerpts for the top precedents) are
+# each a separate round trip with no batch endpoint, so independent calls
+# run side by side; under the gevent worker these are greenlets.  Each
+# analysis uses its own executor, so concurrent analyses never wait on
+# each other's round trips.
+EXCERPT_COUNT = 3
+KANOON_FANOUT = 4  # Max concurrent Indian Kanoon calls per analysis
+
 
 class LegalBriefAnalyzer:
     """
@@ -257,52 +411,22 @@ class LegalBriefAnalyzer:
         text_lower = text.lower()
         scores: Dict[str, float] = {}
 
-        keyword_map = {
-            "Criminal": ["fir", "accused", "offence", "crime", "bail", "arrest",
-                         "prosecution", "charge sheet", "cognizable", "ipc", "bns",
-                         "crpc", "bnss", "murder", "theft", "robbery", "fraud",
-                         "cheating", "assault", "kidnap"],
-            "Civil": ["suit", "plaintiff", "defendant", "decree", "injunction",
-                      "damages", "specific performance", "partition", "declaration",
-                      "civil suit", "cpc"],
-            "Constitutional / Writ": ["writ", "fundamental right", "article 14",
-                                       "article 19", "article 21", "article 32",
-                                       "article 226", "habeas corpus", "mandamus",
-                                       "certiorari", "prohibition", "quo warranto",
-                                       "constitution"],
-            "Family / Matrimonial": ["divorce", "maintenance", "custody", "marriage",
-                                      "matrimonial", "alimony", "domestic violence",
-                                      "dowry", "hindu marriage", "muslim law",
-                                      "guardianship", "child support"],
-            "Labour / Industrial": ["employee", "employer", "industrial dispute",
-                                     "retrenchment", "workman", "wages", "gratuity",
-                                     "provident fund", "termination", "labour"],
-            "Consumer": ["consumer", "deficiency", "service", "unfair trade",
-                          "goods", "complaint", "consumer forum", "ncdrc"],
-            "Commercial / Corporate": ["company", "shareholder", "director",
-                                        "insolvency", "nclt", "winding up",
-                                        "debenture", "merger", "acquisition"],
-            "Property / Land": ["property", "land", "possession", "title",
-                                 "encroachment", "easement", "partition",
-                                 "registration", "mutation", "revenue"],
-            "Motor Accident Claims": ["motor accident", "mact", "compensation",
-                                       "vehicle", "accident", "injury",
-                                       "motor vehicles act"],
-            "Arbitration": ["arbitration", "arbitral", "award", "arbitrator",
-                            "conciliation"],
-        }
-
-        for case_type, keywords in keyword_map.items():
-            count = sum(1 for kw in keywords if kw in text_lower)
-            if count > 0:
-                scores[case_type] = count
+        # Scan each distinct keyword once, then score every case type by
+        # set intersection against the keywords actually present.
+        present = {kw for kw in _ALL_CASE_TYPE_KEYWORDS if kw in text_lower}
+        if present:
+            for case_type, keywords in _CASE_TYPE_KEYWORD_SETS.items():
+                count = len(keywords & present)
+                if count > 0:
+                    scores[case_type] = count
 
         if not scores:
             return {"primary": "Other", "confidence": 0.3, "secondary": []}
 
-        sorted_types = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        # Only the primary + two secondaries are reported
+        sorted_types = heapq.nlargest(3, scores.items(), key=lambda x: x[1])
         primary = sorted_types[0]
-        total = sum(s for _, s in sorted_types)
+        total = sum(scores.values())
 
         return {
             "primary": primary[0],
@@ -323,23 +447,18 @@ class LegalBriefAnalyzer:
                 "suggested": entities["courts"][0]
             }
 
-        jurisdiction_keywords = {
-            "Supreme Court of India": ["supreme court", "hon'ble supreme", "sci"],
-            "High Court": ["high court", "hon'ble high court"],
-            "District Court": ["district court", "district judge"],
-            "Sessions Court": ["sessions court", "sessions judge"],
-            "Magistrate Court": ["magistrate", "jmfc", "cjm", "acjm"],
-            "Family Court": ["family court"],
-            "Consumer Forum / Commission": ["consumer forum", "consumer commission",
-                                              "ncdrc", "scdrc", "dcdrc"],
-            "NCLT": ["nclt", "company law tribunal"],
-            "NGT": ["ngt", "green tribunal"],
-            "MACT": ["mact", "motor accident", "claims tribunal"],
-        }
-
-        for court, keywords in jurisdiction_keywords.items():
-            if any(kw in text_lower for kw in keywords):
-                return {"identified_courts": [court], "suggested": court}
+        # One scan of the text; the lowest-numbered group seen is the
+        # highest-priority court (JURISDICTION_KEYWORDS order).
+        best = None
+        for m in _JURISDICTION_PATTERN.finditer(text_lower):
+            idx = _JURISDICTION_GROUP_RANK[m.lastgroup]
+            if best is None or idx < best:
+                best = idx
+                if best == 0:
+                    break
+        if best is not None:
+            court = _JURISDICTION_COURTS[best]
+            return {"identified_courts": [court], "suggested": court}
 
         return {"identified_courts": [], "suggested": "To be determined"}
 
@@ -348,14 +467,8 @@ class LegalBriefAnalyzer:
         issues = []
         text_lower = text.lower()
 
-        issue_indicators = [
-            (r'whether\s+(.+?)(?:\.|$)', 'framed_question'),
-            (r'the\s+(?:main|primary|key|central)\s+issue\s+(?:is|was)\s+(.+?)(?:\.|$)', 'stated_issue'),
-            (r'question\s+(?:of|regarding)\s+(.+?)(?:\.|$)', 'question_of'),
-        ]
-
-        for pattern, source in issue_indicators:
-            matches = re.findall(pattern, text_lower)
+        for pattern, source in _ISSUE_INDICATORS:
+            matches = pattern.findall(text_lower)
             for m in matches:
                 issues.append({
                     "issue": m.strip().capitalize(),
@@ -392,7 +505,7 @@ class LegalBriefAnalyzer:
     def _extract_timeline(self, text: str) -> List[Dict[str, str]]:
         """Build a chronological timeline from date references."""
         timeline = []
-        sentences = re.split(r'[.;]', text)
+        sentences = _CLAUSE_SPLIT_RE.split(text)
 
         for sent in sentences:
             dates_found = DATE_PATTERN.findall(sent)
@@ -408,23 +521,25 @@ class LegalBriefAnalyzer:
         """Find every statute / act / section referenced."""
         statutes = []
         text_lower = text.lower()
-
-        for short_name, full_name in INDIAN_ACTS.items():
-            if short_name.lower() in text_lower:
-                # Find associated sections
-                associated_sections = []
-                for s in entities.get("sections", []):
-                    # Check if section is near this act mention
-                    idx = text_lower.find(short_name.lower())
-                    s_idx = text_lower.find(f"section {s}".lower())
-                    if idx >= 0 and s_idx >= 0 and abs(idx - s_idx) < 300:
-                        associated_sections.append(s)
+        sections = entities.get("sections", [])
+        # First "section N" position per section, located once rather than per act
+        section_pos = {s: text_lower.find(f"section {s}".lower()) for s in sections}
+
+        for short_name, full_name, short_lower in _INDIAN_ACTS_LOWER:
+            idx = text_lower.find(short_lower)
+            if idx >= 0:
+                # Find associated sections (section mention near this act mention)
+                associated_sections = [
+                    s for s in sections
+                    if section_pos[s] >= 0 and abs(idx - section_pos[s]) < 300
+                ]
 
                 statutes.append({
                     "short_name": short_name,
                     "full_name": full_name,
-                    "sections": associated_sections if associated_sections else entities.get("sections", [])[:3],
-                    "relevance": "high" if short_name.lower() in text_lower[:500] else "medium"
+                    "sections": associated_sections if associated_sections else sections[:3],
+                    # First mention ends within the opening 500 chars
+                    "relevance": "high" if idx + len(short_lower) <= 500 else "medium"
                 })
 
         # Add any section references not yet tied to an act
@@ -476,43 +591,55 @@ class LegalBriefAnalyzer:
                         "match_type": tag,
                     })
 
-        # ── Pass A: relevance-ranked results ──────────────────────
-        for q in queries:
-            try:
-                results = self.indian_kanoon.search_judgments(q, pagenum=0)
-                _add_docs(results.get("docs", [])[:5], "relevance")
-            except Exception as e:
-                logger.warning("Precedent search failed for query '%s': %s", q, e)
-
-        # ── Pass B: most-recent results (last 3 years) ───────────
-        for q in queries:
-            try:
-                results = self.indian_kanoon.search_recent(q, years=3, pagenum=0)
-                _add_docs(results.get("docs", [])[:5], "recent")
-            except Exception as e:
-                logger.warning("Recent precedent search failed for query '%s': %s", q, e)
-
-        logger.info("Indian Kanoon returned %d precedents (%d relevance + %d recent) for %d queries",
-                     len(precedents),
-                     sum(1 for p in precedents if p["match_type"] == "relevance"),
-                     sum(1 for p in precedents if p["match_type"] == "recent"),
-                     len(queries))
-
-        # ── Fetch full-text excerpts for top 3 precedents ────────
-        fetched = 0
-        for p in precedents:
-            if fetched >= 3:
-                break
-            doc_id = p.get("doc_id")
-            if not doc_id:
-                continue
-            try:
-                excerpt = self.indian_kanoon.get_doc_excerpt(str(doc_id), max_chars=3000)
-                if excerpt:
-                    p["excerpt"] = excerpt
-                    fetched += 1
-            except Exception as e:
-                logger.warning("Excerpt fetch failed for doc %s: %s", doc_id, e)
+        with ThreadPoolExecutor(max_workers=KANOON_FANOUT, thread_name_prefix="kanoon") as pool:
+            # Both passes are independent searches — issue them all at once and
+            # merge in pass order, so dedupe keeps relevance hits first.
+            relevance = [pool.submit(self.indian_kanoon.search_judgments, q, pagenum=0)
+                         for q in queries]
+            recent = [pool.submit(self.indian_kanoon.search_recent, q, years=3, pagenum=0)
+                      for q in queries]
+
+            # ── Pass A: relevance-ranked results ──────────────────────
+            for q, future in zip(queries, relevance):
+                try:
+                    _add_docs(future.result().get("docs", [])[:5], "relevance")
+                except Exception as e:
+                    logger.warning("Precedent search failed for query '%s': %s", q, e)
+
+            # ── Pass B: most-recent results (last 3 years) ───────────
+            for q, future in zip(queries, recent):
+                try:
+                    _add_docs(future.result().get("docs", [])[:5], "recent")
+                except Exception as e:
+                    logger.warning("Recent precedent search failed for query '%s': %s", q, e)
+
+            match_counts = Counter(p["match_type"] for p in precedents)
+            logger.info("Indian Kanoon returned %d precedents (%d relevance + %d recent) for %d queries",
+                         len(precedents), match_counts["relevance"], match_counts["recent"],
+                         len(queries))
+
+            # ── Fetch full-text excerpts for top 3 precedents ────────
+            # Request only as many as are still missing per round, so the
+            # excerpts land on the same (first successful) precedents as a
+            # one-by-one walk would pick.
+            candidates = [p for p in precedents if p.get("doc_id")]
+            fetched = 0
+            while fetched < EXCERPT_COUNT and candidates:
+                batch = candidates[:EXCERPT_COUNT - fetched]
+                del candidates[:len(batch)]
+                futures = [
+                    pool.submit(self.indian_kanoon.get_doc_excerpt, str(p["doc_id"]), max_chars=3000)
+                    for p in batch
+                ]
+                for p, future in zip(batch, futures):
+                    try:
+                        excerpt = future.result()
+                    except Exception as e:
+                        logger.warning("Excerpt fetch failed for doc %s: %s", p["doc_id"], e)
+                        continue
+                    if excerpt:
+                        p["excerpt"] = excerpt
+                        fetched += 1
         if fetched:
             logger.info("Fetched full-text excerpts for %d precedents", fetched)
 
@@ -548,34 +675,7 @@ class LegalBriefAnalyzer:
             )
 
         # Type-specific arguments
-        type_arguments = {
-            "Criminal": [
-                "Challenge the legality of arrest / FIR if procedural irregularities exist.",
-                "Examine whether ingredients of the alleged offence are made out.",
-                "Consider bail application if the accused is in custody."
-            ],
-            "Civil": [
-                "Establish cause of action with documentary evidence.",
-                "Check limitation period under the Limitation Act, 1963.",
-                "Consider interim relief / injunction to protect rights during pendency."
-            ],
-            "Constitutional / Writ": [
-                "Demonstrate violation of fundamental rights with specificity.",
-                "Establish locus standi of the petitioner.",
-                "Show that no alternative efficacious remedy is available."
-            ],
-            "Family / Matrimonial": [
-                "Consider mediation / alternate dispute resolution as mandated by the court.",
-                "Gather evidence of cruelty / desertion as applicable.",
-                "Assess maintenance and custody rights carefully."
-            ],
-            "Consumer": [
-                "Establish deficiency in service or defect in goods with evidence.",
-                "File within the limitation period (2 years from cause of action).",
-                "Claim appropriate compensation and costs."
-            ],
-        }
-        arguments.extend(type_arguments.get(primary, []))
+        arguments.extend(STRATEGY_ARGUMENTS.get(primary, ()))
 
         # Challenges
         challenges = []
@@ -610,7 +710,7 @@ class LegalBriefAnalyzer:
 
     def _summarise(self, text: str, max_len: int = 500) -> str:
         """Simple extractive summary — first meaningful sentences."""
-        sentences = re.split(r'(?<=[.!?])\s+', text.strip())
+        sentences = _SENTENCE_END_RE.split(text.strip())
         summary = ""
         for s in sentences:
             if len(summary) + len(s) > max_len:
@@ -620,37 +720,11 @@ class LegalBriefAnalyzer:
 
     def _evidence_checklist(self, case_type: str, entities: dict) -> List[str]:
         """Suggest evidence to collect based on case type."""
-        base = ["Signed Vakalatnama", "Court fee stamp papers", "Identity proof of parties"]
-        type_evidence = {
-            "Criminal": ["Copy of FIR", "Charge sheet", "Bail application",
-                          "Medical / forensic reports", "Witness statements"],
-            "Civil": ["Original contracts / agreements", "Property documents",
-                       "Correspondence / notices", "Valuation reports"],
-            "Constitutional / Writ": ["Government orders under challenge",
-                                       "Representation letters sent",
-                                       "Constitutional provision analysis"],
-            "Family / Matrimonial": ["Marriage certificate", "Income proof",
-                                      "Evidence of cruelty / desertion",
-                                      "Children's school records"],
-            "Property / Land": ["Title deed", "Survey records", "Mutation entries",
-                                 "Tax receipts", "Encumbrance certificate"],
-            "Consumer": ["Purchase invoice / receipt", "Warranty documents",
-                          "Complaint letters", "Expert opinion on defect"],
-            "Motor Accident Claims": ["FIR / accident report", "Medical bills",
-                                       "Disability certificate", "Income proof",
-                                       "Vehicle registration / insurance"],
-        }
-        return base + type_evidence.get(case_type, [])
+        return [*BASE_EVIDENCE, *EVIDENCE_CHECKLIST.get(case_type, ())]
 
     def _next_steps(self, case_type: str) -> List[str]:
         """Suggest procedural next steps."""
-        common = [
-            "1. Finalise and verify all facts with the client",
-            "2. Draft the petition / complaint / suit",
-            "3. Arrange supporting documents and evidence",
-            "4. File before the appropriate forum with court fee",
-            "5. Serve notice on opposite party as required",
-        ]
+        common = list(NEXT_STEPS)
         if case_type == "Criminal":
             common.insert(2, "2a. If bail needed, file bail application on priority")
         if case_type in ("Civil", "Property / Land"):
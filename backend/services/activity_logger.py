@@ -0,0 +1,175 @@
+"""
+LexAssist — Activity Logger
+============================
+Single write path for the ``activity_log`` table.
+
+Every endpoint that records a user action goes through ``ActivityLogger.log``
+instead of building its own insert.  The ``metadata`` column is ``jsonb``, so
+the dict is handed to PostgREST as-is — no ``json.dumps`` on the way in and no
+``json.loads`` on the way out.
+
+Activity rows are secondary bookkeeping, so they are written off the request
+path: ``log`` only enqueues the row, and a daemon writer thread (a greenlet
+under gevent) drains the queue and inserts everything pending as a single
+multi-row insert.  After the first row it lingers briefly so the rows of a
+burst share one insert instead of racing out one at a time.  The queue is
+bounded — when the writer falls behind, the row is written inline instead of
+letting memory grow.  A batch rejected over one row's values is retried in
+halves so that row doesn't cost the rest; any failure is logged and swallowed
+so it can never fail the request that triggered it.
+
+Because the insert lands some time after the action, ``created_at`` is
+stamped (UTC) when the row is queued rather than left to the column default.
+"""
+
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from postgrest.exceptions import APIError
+
+from backend.utils.logger import setup_logger
+
+logger = setup_logger("ActivityLogger")
+
+# Postgres errors caused by one row's values (FK / NOT NULL / CHECK violation,
+# malformed uuid).  Only these are worth splitting a batch over — anything
+# else (RLS, schema, permissions, a 5xx) would fail every half the same way.
+_ROW_ERROR_CODES = frozenset({"23503", "23502", "23514", "22P02"})
+
+
+class ActivityLogger:
+    """
+    Record user actions in ``activity_log``.
+
+    Usage:
+        activity_logger = ActivityLogger(supabase)
+        activity_logger.log(user_id, "brief_analyzed", title="Brief Analysis",
+                            detail=snippet, metadata={"brief_id": brief_id})
+    """
+
+    TABLE = "activity_log"
+    MAX_PENDING = 500   # Bound on queued rows before falling back to inline writes
+    BATCH_SIZE = 50     # Max rows per multi-row insert
+    LINGER = 0.1        # Seconds the writer waits for more rows after the first
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=self.MAX_PENDING)
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    @staticmethod
+    def build_row(
+        user_id: str,
+        action: str,
+        title: Optional[str] = None,
+        detail: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        case_id: Optional[str] = None,
+        created_at: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Build an ``activity_log`` row.
+
+        Every row carries the same key set — PostgREST rejects multi-row
+        inserts whose objects have differing keys.
+        """
+        return {
+            "user_id": user_id,
+            "case_id": case_id,
+            "action": action,
+            "title": title,
+            "detail": detail,
+            "metadata": metadata if metadata is not None else {},  # jsonb — native dict
+            "created_at": created_at or datetime.now(timezone.utc).isoformat(),
+        }
+
+    def log(
+        self,
+        user_id: str,
+        action: str,
+        title: Optional[str] = None,
+        detail: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        case_id: Optional[str] = None,
+        created_at: Optional[str] = None,
+    ) -> None:
+        """Queue one activity row for the background writer. Never raises.
+
+        Pass *created_at* (ISO-8601, UTC) to share one timestamp with other
+        writes made by the same request.
+        """
+        if not user_id or not self.supabase.client:
+            return
+        row = self.build_row(user_id, action, title, detail, metadata, case_id, created_at)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            logger.warning("Activity queue full (%d) — writing inline", self.MAX_PENDING)
+            self._write([row])
+            return
+        self._ensure_worker()
+
+    def flush(self) -> None:
+        """Synchronously write everything still queued (used at interpreter exit)."""
+        while True:
+            batch = self._drain(self.BATCH_SIZE)
+            if not batch:
+                return
+            self._write(batch)
+
+    # ── Background writer ─────────────────────────────────────────
+
+    def _ensure_worker(self) -> None:
+        """Start the writer lazily so it is created inside the serving worker."""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="activity-log-writer", daemon=True,
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            self._write([first] + self._drain(self.BATCH_SIZE - 1, wait=self.LINGER))
+
+    def _drain(self, limit: int, wait: float = 0.0) -> List[Dict[str, Any]]:
+        """Pop up to *limit* queued rows, waiting at most *wait* seconds in total."""
+        rows: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + wait
+        while len(rows) < limit:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    rows.append(self._queue.get(timeout=remaining))
+                else:
+                    rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        try:
+            self.supabase.client.table(self.TABLE).insert(rows).execute()
+        except APIError as e:
+            if e.code not in _ROW_ERROR_CODES:
+                logger.warning("Activity log write failed, dropping %d row(s): %s", len(rows), e)
+                return
+            if len(rows) == 1:
+                logger.warning("Activity log row rejected: %s", e)
+                return
+            # One bad row (e.g. its case deleted while it sat in the queue)
+            # rejects the whole insert — split the batch so only that row is lost.
+            logger.warning("Activity log batch of %d rejected, retrying in halves: %s", len(rows), e)
+            mid = len(rows) // 2
+            self._write(rows[:mid])
+            self._write(rows[mid:])
+        except Exception as e:
+            logger.warning("Activity log write failed (%d row(s)): %s", len(rows), e)
@@ -0,0 +1,34 @@
+"""
+LexAssist — Shared API Clients
+===============================
+One OpenAI and one Anthropic client per worker process.
+
+Several services call the same provider — Whisper transcription and
+Vision OCR both go to OpenAI; the analysis pipeline and the transcript
+correction layer both go to Anthropic.  Each SDK client owns its own
+connection pool, so separate clients meant a second set of TCP/TLS
+handshakes to the same host.  Sharing them keeps every call on the same
+warm keep-alive connections.
+
+Callers check SDK availability and the API key before asking for a client.
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_openai_client(api_key: str):
+    """Process-wide ``openai.OpenAI`` for *api_key*."""
+    import openai
+    return openai.OpenAI(api_key=api_key)
+
+
+@lru_cache(maxsize=None)
+def get_anthropic_client(api_key: str):
+    """Process-wide ``anthropic.Anthropic`` for *api_key*.
+
+    The timeout stays under gunicorn's 300s worker timeout and gives
+    enough room for 16K-token responses.
+    """
+    import anthropic
+    return anthropic.Anthropic(api_key=api_key, timeout=290.0)
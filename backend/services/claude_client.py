@@ -12,13 +12,14 @@ Features:
 """
 
 import gc
-import hashlib
 import json
 import re
 import time
-from typing import Any, Dict, Generator, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, Generator, List, NamedTuple, Optional
 from backend.config import Config
 from backend.data.indian_statutes import lookup_sections
+from backend.services.api_clients import get_anthropic_client
 from backend.utils.logger import setup_logger
 
 logger = setup_logger("ClaudeClient")
@@ -40,6 +41,74 @@ except ImportError:
     _HTTPX_AVAILABLE = False
 
 
+# Citation matching helpers (Pass 3)
+_WARNING_PREFIX_RE = re.compile(r'^⚠️\s*')
+_VERSUS_RE = re.compile(r'\bv\.?\s*s?\.?\b|\bversus\b')
+
+# Offline STT cleanup rules, compiled into one alternation so the
+# transcript is scanned once.  Each rule is one group (m.lastindex picks
+# its replacement); earlier rules win at a position (BNS before BNSS, as
+# before).  Numbered headings look ahead for the digit instead of
+# capturing it, so no rule carries an inner group.
+_STT_CLEANUP_RULES = (
+    (r'\bi p c\b', 'IPC'), (r'\bc r p c\b', 'CrPC'), (r'\bc p c\b', 'CPC'),
+    (r'\bb n s\b', 'BNS'), (r'\bb n s s\b', 'BNSS'), (r'\bb s a\b', 'BSA'),
+    (r'\bfir\b', 'FIR'), (r'\bn c l t\b', 'NCLT'), (r'\bn c d r c\b', 'NCDRC'),
+    (r'\brera\b', 'RERA'), (r'\bpocso\b', 'POCSO'), (r'\bndps\b', 'NDPS'),
+    (r'\bsection (?=\d)', 'Section '),
+    (r'\barticle (?=\d)', 'Article '),
+    (r'\border (?=\d)', 'Order '),
+    (r'\brule (?=\d)', 'Rule '),
+)
+_STT_CLEANUP_RE = re.compile(
+    "|".join(f"({pattern})" for pattern, _ in _STT_CLEANUP_RULES), re.IGNORECASE,
+)
+_STT_CLEANUP_REPLACEMENTS = (None,) + tuple(r for _, r in _STT_CLEANUP_RULES)
+
+# Output post-processing (_postprocess_analysis) — compiled / fixed once
+_NON_WORD_RE = re.compile(r"\W+")
+_INLINE_SPACE_RE = re.compile(r"[^\S\n]+")    # whitespace runs within a line
+_LINE_EDGE_SPACE_RE = re.compile(r" ?\n ?")  # one space either side of a break
+_PARAGRAPH_BREAK_RE = re.compile(r"\n{2,}")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")  # Kanoon headlines carry markup
+
+_PARAGRAPH_FIELDS = ("case_summary",)
+_STRING_LIST_FIELDS = (
+    "next_steps_layman",
+    "strategic_recommendations",
+    "arguments_for_petitioner",
+    "arguments_for_respondent",
+    "evidence_checklist",
+    "procedural_requirements",
+)
+# List-of-dict fields deduplicated on the squashed values of these keys
+_RECORD_DEDUPE_KEYS = (
+    ("legal_issues", ("issue", "applicable_law")),
+    ("relevant_precedents", ("case_name", "citation")),
+)
+
+
+def _dedupe_token(value: Any) -> str:
+    """Lowercase *value* with every non-word character removed."""
+    return _NON_WORD_RE.sub("", str(value)).lower()
+
+
+@lru_cache(maxsize=2048)
+def _normalise_versus(name: str) -> str:
+    """Collapse "v." / "vs" / "vs." / "versus" to "v" for case-name comparison.
+
+    Memoised: the Kanoon ground-truth pool comes from the search cache, so
+    every verification pass over a brief normalises the same titles again.
+    """
+    return _VERSUS_RE.sub('v', name)
+
+
+class _CachedContext(NamedTuple):
+    """Smart-context cache entry — a plain tuple, no per-entry dict."""
+    text: str
+    ts: float
+
+
 # ──────────────────────────────────────────────────────────────────────
 # System prompts
 # ──────────────────────────────────────────────────────────────────────
@@ -257,7 +326,7 @@ class ClaudeClient:
         self.client = None
         self.api_key = Config.CLAUDE_API_KEY
         self._available = False
-        self._context_cache: Dict[str, dict] = {}  # Cache for smart context summaries {key: {text, ts}}
+        self._context_cache: Dict[str, _CachedContext] = {}  # Cache for smart context summaries {brief: (text, ts)}
         self._cache_ttl = 3600  # 1-hour TTL for cached context summaries
 
         if not _ANTHROPIC_AVAILABLE:
@@ -269,10 +338,8 @@ class ClaudeClient:
             return
 
         try:
-            self.client = anthropic.Anthropic(
-                api_key=self.api_key,
-                timeout=290.0,  # Stay under gunicorn's 300s worker timeout; gives enough room for 16K-token responses
-            )
+            # Shared with the speech correction layer (one connection pool)
+            self.client = get_anthropic_client(self.api_key)
             self._available = True
             logger.info("Claude client initialized (chat: %s, deep: %s, fast: %s)", self.MODEL, self.MODEL_DEEP, self.MODEL_FAST)
         except Exception as e:
@@ -294,7 +361,7 @@ class ClaudeClient:
         stripped = text.strip()
 
         # 1. Already valid JSON (starts with { or [)
-        if stripped.startswith("{") or stripped.startswith("["):
+        if stripped.startswith(("{", "[")):
             return stripped
 
         # 2. Markdown code block: ```json ... ``` or ``` ... ```
@@ -375,11 +442,13 @@ class ClaudeClient:
     @staticmethod
     def _normalize_whitespace(text: str) -> str:
         """Normalize whitespace while preserving paragraph breaks."""
-        if not isinstance(text, str):
+        if not isinstance(text, str) or not text:
             return text
         text = text.replace("\r\n", "\n").replace("\r", "\n")
-        lines = [re.sub(r"\s+", " ", line).strip() for line in text.split("\n")]
-        return "\n".join(lines).strip()
+        # Collapse runs within lines, then trim around each break — two
+        # passes over the whole text instead of a regex call per line.
+        text = _INLINE_SPACE_RE.sub(" ", text)
+        return _LINE_EDGE_SPACE_RE.sub("\n", text).strip()
 
     @classmethod
     def _dedupe_paragraphs(cls, text: str) -> str:
@@ -388,18 +457,24 @@ class ClaudeClient:
             return text
 
         normalized = cls._normalize_whitespace(text)
-        paragraphs = [p.strip() for p in re.split(r"\n{2,}", normalized) if p.strip()]
-        if len(paragraphs) <= 1:
-            return normalized
 
+        # One pass over the split: strip, count and dedupe each paragraph
+        # together instead of materialising a stripped copy first.
         seen = set()
         unique: List[str] = []
-        for p in paragraphs:
-            key = re.sub(r"\W+", "", p).lower()
+        count = 0
+        for p in _PARAGRAPH_BREAK_RE.split(normalized):
+            p = p.strip()
+            if not p:
+                continue
+            count += 1
+            key = _dedupe_token(p)
             if key and key not in seen:
                 seen.add(key)
                 unique.append(p)
 
+        if count <= 1:
+            return normalized
         return "\n\n".join(unique).strip()
 
     @staticmethod
@@ -433,54 +508,38 @@ class ClaudeClient:
             return result
 
         # Normalize and dedupe long text blocks
-        for field in ["case_summary"]:
+        for field in _PARAGRAPH_FIELDS:
             if isinstance(result.get(field), str):
                 result[field] = cls._dedupe_paragraphs(result[field])
 
         # Normalize list-of-strings fields
-        for field in [
-            "next_steps_layman",
-            "strategic_recommendations",
-            "arguments_for_petitioner",
-            "arguments_for_respondent",
-            "evidence_checklist",
-            "procedural_requirements",
-        ]:
+        for field in _STRING_LIST_FIELDS:
             value = result.get(field)
             if isinstance(value, list):
                 cleaned = [cls._normalize_whitespace(v) for v in value if isinstance(v, str) and v.strip()]
-                result[field] = cls._dedupe_list_by_key(cleaned, lambda x: re.sub(r"\W+", "", x).lower())
-
-        # Deduplicate legal_issues by issue + applicable law
-        if isinstance(result.get("legal_issues"), list):
-            result["legal_issues"] = cls._dedupe_list_by_key(
-                result["legal_issues"],
-                lambda x: (
-                    re.sub(r"\W+", "", str(x.get("issue", ""))).lower() + "|" +
-                    re.sub(r"\W+", "", str(x.get("applicable_law", ""))).lower()
-                ) if isinstance(x, dict) else None,
-            )
+                result[field] = cls._dedupe_list_by_key(cleaned, _dedupe_token)
+
+        # Deduplicate legal_issues (issue + applicable law) and
+        # precedents (case_name + citation)
+        for field, keys in _RECORD_DEDUPE_KEYS:
+            if isinstance(result.get(field), list):
+                result[field] = cls._dedupe_list_by_key(
+                    result[field],
+                    lambda x, keys=keys: "|".join(
+                        _dedupe_token(x.get(k, "")) for k in keys
+                    ) if isinstance(x, dict) else None,
+                )
 
         # Deduplicate statutes by act + sections
         if isinstance(result.get("applicable_statutes"), list):
             result["applicable_statutes"] = cls._dedupe_list_by_key(
                 result["applicable_statutes"],
                 lambda x: (
-                    re.sub(r"\W+", "", str(x.get("act", ""))).lower() + "|" +
+                    _dedupe_token(x.get("act", "")) + "|" +
                     ",".join(sorted([str(s).strip().lower() for s in (x.get("sections") or [])]))
                 ) if isinstance(x, dict) else None,
             )
 
-        # Deduplicate precedents by case_name + citation
-        if isinstance(result.get("relevant_precedents"), list):
-            result["relevant_precedents"] = cls._dedupe_list_by_key(
-                result["relevant_precedents"],
-                lambda x: (
-                    re.sub(r"\W+", "", str(x.get("case_name", ""))).lower() + "|" +
-                    re.sub(r"\W+", "", str(x.get("citation", ""))).lower()
-                ) if isinstance(x, dict) else None,
-            )
-
         return result
 
     # ── Smart Context Builder ────────────────────────────────────
@@ -490,7 +549,7 @@ class ClaudeClient:
         Intelligently extract and prioritize key parts of a legal brief.
         For short texts, returns as-is. For long texts, creates a structured
         summary using a fast model, preserving legally critical details.
-        Results are cached by content hash to avoid repeated API calls
+        Results are cached by brief text to avoid repeated API calls
         for the same brief across multiple chat turns.
         """
         if not text or len(text) <= max_chars:
@@ -499,17 +558,18 @@ class ClaudeClient:
         if not self.is_available:
             return text[:max_chars]
 
-        # Check cache — same brief across multiple chat turns shouldn't re-summarize
-        import time as _time
-        cache_key = hashlib.md5(text[:2000].encode("utf-8", errors="ignore")).hexdigest()
-        if cache_key in self._context_cache:
-            entry = self._context_cache[cache_key]
-            if _time.time() - entry["ts"] < self._cache_ttl:
+        # Check cache — same brief across multiple chat turns shouldn't re-summarize.
+        # Keyed by the text itself: the str hash runs in C with no encode
+        # or digest step, and the dict's equality check makes hits exact
+        # (briefs sharing an opening no longer collide).
+        cache_key = text
+        entry = self._context_cache.get(cache_key)
+        if entry is not None:
+            if time.time() - entry.ts < self._cache_ttl:
                 logger.debug("Smart context cache hit")
-                return entry["text"]
-            else:
-                del self._context_cache[cache_key]
-                logger.debug("Smart context cache expired, regenerating")
+                return entry.text
+            del self._context_cache[cache_key]
+            logger.debug("Smart context cache expired, regenerating")
 
         try:
             response = self.client.messages.create(
@@ -535,7 +595,7 @@ Brief:
             # Cache the result (limit cache size to 20 entries to bound memory)
             if len(self._context_cache) >= 20:
                 self._context_cache.pop(next(iter(self._context_cache)))
-            self._context_cache[cache_key] = {"text": summary, "ts": _time.time()}
+            self._context_cache[cache_key] = _CachedContext(summary, time.time())
             return summary
         except Exception as e:
             logger.warning("Smart context extraction failed, truncating: %s", e)
@@ -556,7 +616,7 @@ Brief:
         if p.get("publishdate"):
             line += f" [{p['publishdate']}]"
         if p.get("headline"):
-            clean_headline = re.sub(r'<[^>]+>', '', p['headline'])[:200]
+            clean_headline = _HTML_TAG_RE.sub('', p['headline'])[:200]
             line += f"\n   Summary: {clean_headline}"
         if p.get("excerpt"):
             line += f"\n   **Judgment Excerpt (ratio decidendi):**\n   {p['excerpt'][:2000]}"
@@ -633,11 +693,21 @@ Brief:
         # ── Layer 1: Indian Kanoon ground-truth matching ─────────
         kanoon_titles_lower: Dict[str, Dict] = {}
         if kanoon_precedents:
-            for kp in kanoon_precedents:
-                title = (kp.get("title") or "").strip().lower()
-                if title:
-                    kanoon_titles_lower[title] = kp
+            kanoon_titles_lower = {
+                title: kp
+                for kp in kanoon_precedents
+                if (title := (kp.get("title") or "").strip().lower())
+            }
             logger.info("Ground-truth pool: %d Indian Kanoon cases for cross-referencing", len(kanoon_titles_lower))
+        # Normalised titles for fuzzy matching — built once per pool, not
+        # once per (citation, pool entry) pair.  A fuzzy match needs both
+        # names longer than 15 chars, so shorter titles are dropped here
+        # and never compared.
+        kanoon_norm = [
+            (norm_kt, kd)
+            for kt, kd in kanoon_titles_lower.items()
+            if len(norm_kt := _normalise_versus(kt)) > 15
+        ]
 
         db_verified_count = 0
         unverified_indices: List[int] = []  # indices needing AI verification
@@ -645,7 +715,7 @@ Brief:
         for i, p in enumerate(precedents):
             case_name = (p.get("case_name") or "").strip().lower()
             # Remove any existing ⚠️ prefix for matching
-            clean_name = re.sub(r'^⚠️\s*', '', case_name)
+            clean_name = _WARNING_PREFIX_RE.sub('', case_name)
 
             matched = False
             # Exact match
@@ -655,16 +725,14 @@ Brief:
             else:
                 # Fuzzy match: check if any Kanoon title is a substantial substring
                 # or vice versa (handles "X v. Y" vs "X vs Y" etc.)
-                for kt, kd in kanoon_titles_lower.items():
-                    # Normalize "v." / "vs" / "vs." / "versus" for comparison
-                    norm_name = re.sub(r'\bv\.?\s*s?\.?\b|\bversus\b', 'v', clean_name)
-                    norm_kt = re.sub(r'\bv\.?\s*s?\.?\b|\bversus\b', 'v', kt)
-                    if (norm_name and norm_kt and
-                            (norm_name in norm_kt or norm_kt in norm_name) and
-                            len(min(norm_name, norm_kt, key=len)) > 15):
-                        matched = True
-                        match_data = kd
-                        break
+                # Names of 15 chars or fewer can never fuzzy-match — skip the scan.
+                norm_name = _normalise_versus(clean_name)
+                if len(norm_name) > 15:
+                    for norm_kt, kd in kanoon_norm:
+                        if norm_name in norm_kt or norm_kt in norm_name:
+                            matched = True
+                            match_data = kd
+                            break
 
             if matched:
                 precedents[i]["citation_confidence"] = 5
@@ -895,9 +963,11 @@ Respond in JSON array: [{{"index": 1, "confidence": 4, "note": "any concerns or
             # ── Indian Kanoon ground-truth precedents ─────────────
             kanoon_precedents = context.get("precedents", [])
             if kanoon_precedents:
-                # Split into landmark (relevance) and recent buckets
-                landmark = [p for p in kanoon_precedents if p.get("match_type") != "recent"]
-                recent   = [p for p in kanoon_precedents if p.get("match_type") == "recent"]
+                # Split into landmark (relevance) and recent buckets — one pass
+                landmark: List[Dict] = []
+                recent: List[Dict] = []
+                for p in kanoon_precedents:
+                    (recent if p.get("match_type") == "recent" else landmark).append(p)
 
                 prompt += "\n\n**VERIFIED PRECEDENTS FROM INDIAN KANOON DATABASE (ground-truth — these are REAL cases):**\n"
                 prompt += "Use these as your PRIMARY citation source. You may cite additional cases from your knowledge, "
@@ -1067,10 +1137,7 @@ Respond in JSON array: [{{"index": 1, "confidence": 4, "note": "any concerns or
             yield "I'm sorry, the AI service is currently unavailable. Please check the Claude API key configuration."
             return
 
-        system = LEGAL_ANALYST_SYSTEM
-        if brief_context:
-            smart_ctx = self._build_smart_context(brief_context)
-            system += f"\n\n**Current Case Context (use this to give SPECIFIC answers):**\n{smart_ctx}"
+        system = self._chat_system(brief_context)
 
         try:
             with self.client.messages.stream(
@@ -1090,6 +1157,21 @@ Respond in JSON array: [{{"index": 1, "confidence": 4, "note": "any concerns or
             logger.error("Unexpected streaming error: %s", e)
             yield f"\n\n[Error: {str(e)}]"
 
+    def _chat_system(self, brief_context: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Chat system prompt (instructions + case context) as one cached block.
+
+        Every turn of a conversation resends the same system text, so it is
+        marked for prompt caching and later turns reuse the processed prefix
+        instead of paying for it again.  Prompts below the model's minimum
+        cacheable length are simply sent uncached.
+        """
+        system = LEGAL_ANALYST_SYSTEM
+        if brief_context:
+            smart_ctx = self._build_smart_context(brief_context)
+            system += f"\n\n**Current Case Context (use this to give SPECIFIC answers):**\n{smart_ctx}"
+        return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+
     # ── Non-Streaming Chat ───────────────────────────────────────
 
     def chat(
@@ -1101,10 +1183,7 @@ Respond in JSON array: [{{"index": 1, "confidence": 4, "note": "any concerns or
         if not self.is_available:
             return "AI service is currently unavailable."
 
-        system = LEGAL_ANALYST_SYSTEM
-        if brief_context:
-            smart_ctx = self._build_smart_context(brief_context)
-            system += f"\n\n**Current Case Context (use this to give SPECIFIC answers):**\n{smart_ctx}"
+        system = self._chat_system(brief_context)
 
         try:
             response = self.client.messages.create(
@@ -1308,18 +1387,6 @@ Return ONLY the corrected text, nothing else."""}],
     @staticmethod
     def _basic_stt_cleanup(text: str) -> str:
         """Basic regex-based STT cleanup when AI is unavailable."""
-        # Common STT misheard legal abbreviations
-        replacements = {
-            r'\bi p c\b': 'IPC', r'\bc r p c\b': 'CrPC', r'\bc p c\b': 'CPC',
-            r'\bb n s\b': 'BNS', r'\bb n s s\b': 'BNSS', r'\bb s a\b': 'BSA',
-            r'\bfir\b': 'FIR', r'\bn c l t\b': 'NCLT', r'\bn c d r c\b': 'NCDRC',
-            r'\brera\b': 'RERA', r'\bpocso\b': 'POCSO', r'\bndps\b': 'NDPS',
-            r'\bsection (\d)': r'Section \1',
-            r'\barticle (\d)': r'Article \1',
-            r'\border (\d)': r'Order \1',
-            r'\brule (\d)': r'Rule \1',
-        }
-        result = text
-        for pattern, replacement in replacements.items():
-            result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
-        return result
+        return _STT_CLEANUP_RE.sub(
+            lambda m: _STT_CLEANUP_REPLACEMENTS[m.lastindex], text,
+        )
@@ -21,10 +21,13 @@ import io
 import os
 import re
 import time
-import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple
 
 from backend.config import Config
+from backend.services.api_clients import get_openai_client
 from backend.utils.logger import setup_logger
 
 logger = setup_logger("DocumentService")
@@ -59,11 +62,29 @@ except ImportError:
 # Constants
 # ──────────────────────────────────────────────────────────────────
 
-SUPPORTED_IMAGE_FORMATS = {"jpg", "jpeg", "png", "webp", "tiff", "tif", "bmp", "gif"}
-SUPPORTED_DOC_FORMATS = {"pdf", "doc", "docx"}
+SUPPORTED_IMAGE_FORMATS = frozenset({"jpg", "jpeg", "png", "webp", "tiff", "tif", "bmp", "gif"})
+SUPPORTED_DOC_FORMATS = frozenset({"pdf", "doc", "docx"})
 ALL_SUPPORTED_FORMATS = SUPPORTED_IMAGE_FORMATS | SUPPORTED_DOC_FORMATS
+# Sorted once for error messages and get_status()
+_SORTED_FORMATS = tuple(sorted(ALL_SUPPORTED_FORMATS))
+_ACCEPTED_FORMATS_STR = ", ".join(_SORTED_FORMATS)
 MAX_FILE_SIZE_MB = 5
 MAX_PAGES_FOR_OCR = 20  # Limit pages sent to Vision API
+# Scanned-PDF pages are OCR'd by separate Vision calls with no batch
+# endpoint, so pages run side by side (greenlets under the gevent worker).
+# Each document gets its own executor, and only this many of its pages are
+# rendered and in flight at once.
+OCR_PAGES_IN_FLIGHT = 4
+
+# Extension → MIME type for the Vision data URL (anything else is sent as PNG)
+IMAGE_MIME_TYPES = {
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "gif": "image/gif",
+    "tiff": "image/tiff",
+    "tif": "image/tiff",
+}
 
 # ── Supported Indian Vernacular Languages ─────────────────────────
 # Maps language hint codes → display names and script names used in prompts
@@ -85,9 +106,23 @@ VERNACULAR_LANGUAGES: dict = {
     "mixed": {"label": "Mixed / Multiple",      "script": "multiple"},
 }
 
-# Document type classification keywords
+# Every accepted spelling of a language hint → its VERNACULAR_LANGUAGES code:
+# the code itself, a regional tag ("hi-in"), and each part of the label
+# ("hindi", "தமிழ்").  Normalising a hint is then a single dict probe.
+LANGUAGE_HINT_ALIASES: Dict[str, str] = {}
+for _code, _info in VERNACULAR_LANGUAGES.items():
+    LANGUAGE_HINT_ALIASES[_code] = _code
+    if _info["script"] not in (None, "multiple"):
+        LANGUAGE_HINT_ALIASES[f"{_code}-in"] = _code
+        LANGUAGE_HINT_ALIASES[f"{_code}_in"] = _code
+    for _name in _info["label"].split(" / "):
+        LANGUAGE_HINT_ALIASES.setdefault(_name.strip().lower(), _code)
+LANGUAGE_HINT_ALIASES.setdefault("oriya", "or")
+del _code, _info, _name
+
+# Document type classification keywords (lowercase — matched against lowered text)
 DOCUMENT_TYPES = {
-    "petition": ["petition", "writ petition", "special leave petition", "SLP", "pray", "prayer",
+    "petition": ["petition", "writ petition", "special leave petition", "slp", "pray", "prayer",
                   "petitioner", "in the matter of", "most respectfully showeth"],
     "affidavit": ["affidavit", "sworn", "deponent", "solemnly affirm", "oath", "verification",
                    "notary", "commissioner for oaths"],
@@ -101,13 +136,13 @@ DOCUMENT_TYPES = {
                   "held that", "ratio decidendi", "per curiam"],
     "plaint": ["plaint", "plaintiff", "defendant", "suit", "cause of action",
                 "relief sought", "valued for the purposes of"],
-    "charge_sheet": ["charge sheet", "chargesheet", "FIR", "investigation", "accused",
+    "charge_sheet": ["charge sheet", "chargesheet", "fir", "investigation", "accused",
                       "section 173", "police station"],
     "bail_application": ["bail", "bail application", "anticipatory bail", "regular bail",
                           "section 438", "section 439", "surety"],
     "vakalatnama": ["vakalatnama", "vakalat", "power of attorney", "advocate",
                      "authorise", "represent"],
-    "fir": ["first information report", "FIR", "complainant", "police station",
+    "fir": ["first information report", "fir", "complainant", "police station",
              "cognizable offence", "section 154"],
 }
 
@@ -179,6 +214,37 @@ CLASSIFICATION_PROMPT = """Analyse this legal document text and classify it. Ret
 }"""
 
 
+@lru_cache(maxsize=None)
+def _ocr_user_instruction(language_hint: Optional[str]) -> str:
+    """Language-aware user instruction for the Vision OCR call.
+
+    Pure in *language_hint*, which only takes a handful of values, so it is
+    built once per hint instead of once per page.
+    """
+    lang_info = VERNACULAR_LANGUAGES.get(language_hint or "auto")
+    if lang_info and lang_info["script"] and language_hint not in ("auto", "en"):
+        lang_label = lang_info["label"]
+        script_name = lang_info["script"]
+        return (
+            f"This document is in {lang_label} ({script_name} script). "
+            f"Extract ALL text preserving every {script_name} character exactly — "
+            "do NOT transliterate, skip, or convert any vernacular characters. "
+            "Output the original script characters as-is."
+        )
+    if language_hint == "mixed":
+        return (
+            "This document contains MIXED languages (e.g. English + an Indian vernacular script). "
+            "Extract ALL text for EVERY language segment, preserving each script exactly as it appears. "
+            "Do not skip or transliterate any vernacular portion."
+        )
+    return (
+        "Extract all text from this legal document image. "
+        "If you detect any Indic or vernacular script (Devanagari, Tamil, Telugu, Kannada, "
+        "Malayalam, Bengali, Gujarati, Gurmukhi, Odia, Perso-Arabic/Urdu), preserve every "
+        "character in its original Unicode script — do NOT transliterate."
+    )
+
+
 class DocumentService:
     """
     Enterprise document processing service for legal documents.
@@ -194,7 +260,7 @@ class DocumentService:
         openai_key = Config.OPENAI_API_KEY if hasattr(Config, 'OPENAI_API_KEY') else os.environ.get('OPENAI_API_KEY')
         if _OPENAI_AVAILABLE and openai_key:
             try:
-                self.openai_client = openai.OpenAI(api_key=openai_key)
+                self.openai_client = get_openai_client(openai_key)
                 self._ocr_available = True
                 logger.info("Document OCR service initialised (GPT-4o Vision)")
             except Exception as e:
@@ -252,10 +318,8 @@ class DocumentService:
         pages_processed = 0
         ocr_used = False
 
-        # Normalise language hint
-        lang = (language_hint or "auto").strip().lower()
-        if lang not in VERNACULAR_LANGUAGES:
-            lang = "auto"
+        # Normalise language hint (codes, regional tags and language names)
+        lang = LANGUAGE_HINT_ALIASES.get((language_hint or "auto").strip().lower(), "auto")
 
         if is_pdf:
             extracted_text, pages_processed, ocr_used = self._process_pdf(file_data, filename, lang)
@@ -317,7 +381,7 @@ class DocumentService:
         ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
         if ext not in ALL_SUPPORTED_FORMATS:
             return {
-                "error": f"Unsupported file format: .{ext}. Accepted: {', '.join(sorted(ALL_SUPPORTED_FORMATS))}",
+                "error": f"Unsupported file format: .{ext}. Accepted: {_ACCEPTED_FORMATS_STR}",
                 "status": "unsupported_format",
             }
 
@@ -396,34 +460,67 @@ class DocumentService:
         if not _PYMUPDF_AVAILABLE or not self._ocr_available:
             return "", False
 
+        pool = ThreadPoolExecutor(max_workers=OCR_PAGES_IN_FLIGHT, thread_name_prefix="ocr")
+        in_flight = deque()  # (page number, future), oldest first
+        text_parts = []
+
+        def collect_oldest():
+            # Collected in page order; _ocr_image_bytes never raises
+            page_num, future = in_flight.popleft()
+            if page_text := future.result():
+                text_parts.append(f"--- Page {page_num} ---\n{page_text}")
+
         try:
             doc = pymupdf.open(stream=file_data, filetype="pdf")
-            page_count = min(len(doc), MAX_PAGES_FOR_OCR)
-            text_parts = []
-
-            for page_num in range(page_count):
-                page = doc[page_num]
-                # Render page to image at 300 DPI (was 200) — critical for
-                # small Indic glyphs (Tamil, Malayalam, Devanagari, etc.)
+            try:
+                page_count = min(len(doc), MAX_PAGES_FOR_OCR)
+                # Render pages at 300 DPI (was 200) — critical for small Indic
+                # glyphs (Tamil, Malayalam, Devanagari, etc.)
                 mat = pymupdf.Matrix(300 / 72, 300 / 72)
-                pix = page.get_pixmap(matrix=mat)
-                img_bytes = pix.tobytes("png")
-
-                # OCR this page with language hint
-                page_text = self._ocr_image_bytes(
-                    img_bytes,
-                    f"{filename}_page_{page_num + 1}.png",
-                    language_hint=language_hint,
-                )
-                if page_text:
-                    text_parts.append(f"--- Page {page_num + 1} ---\n{page_text}")
 
-            doc.close()
+                for page_num in range(1, page_count + 1):
+                    # Page N+k is rendered only once page N is done, so at
+                    # most OCR_PAGES_IN_FLIGHT encoded pages are held at a time.
+                    if len(in_flight) >= OCR_PAGES_IN_FLIGHT:
+                        collect_oldest()
+
+                    # The raw raster (~25 MB for A4 at 300 DPI) is freed as
+                    # soon as it is PNG-encoded rather than living through the
+                    # OCR round trip — only the compressed page is held meanwhile.
+                    pix = doc[page_num - 1].get_pixmap(matrix=mat)
+                    img_bytes = pix.tobytes("png")
+                    del pix
+
+                    # OCR this page with language hint — submitted as soon as
+                    # it is rendered, so later pages render while earlier ones
+                    # are in flight
+                    in_flight.append((page_num, pool.submit(
+                        self._ocr_image_bytes,
+                        img_bytes,
+                        f"{filename}_page_{page_num}.png",
+                        language_hint=language_hint,
+                    )))
+                    # Rendering is CPU-bound and never yields on its own.
+                    # Under gevent, sleep(0) hands the hub a turn so this
+                    # page's OCR request actually goes out — and other
+                    # requests on the worker run — before the next page is
+                    # rasterised.
+                    time.sleep(0)
+            finally:
+                doc.close()
+
+            while in_flight:
+                collect_oldest()
             return "\n\n".join(text_parts), True
 
         except Exception as e:
             logger.error("PDF OCR error: %s", e)
             return "", False
+        finally:
+            # On a failure part-way, drop whatever has not started yet
+            for _, future in in_flight:
+                future.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
 
     # ── Image Processing ──────────────────────────────────────────
 
@@ -510,41 +607,10 @@ class DocumentService:
             b64_image = base64.b64encode(image_data).decode("utf-8")
 
             # Detect MIME type
-            mime = "image/png"
-            lower_fn = filename.lower()
-            if lower_fn.endswith((".jpg", ".jpeg")):
-                mime = "image/jpeg"
-            elif lower_fn.endswith(".webp"):
-                mime = "image/webp"
-            elif lower_fn.endswith(".gif"):
-                mime = "image/gif"
-            elif lower_fn.endswith((".tiff", ".tif")):
-                mime = "image/tiff"
-
-            # Build language-aware user instruction
-            lang_info = VERNACULAR_LANGUAGES.get(language_hint or "auto")
-            if lang_info and lang_info["script"] and language_hint not in ("auto", "en"):
-                lang_label = lang_info["label"]
-                script_name = lang_info["script"]
-                ocr_user_instruction = (
-                    f"This document is in {lang_label} ({script_name} script). "
-                    f"Extract ALL text preserving every {script_name} character exactly — "
-                    "do NOT transliterate, skip, or convert any vernacular characters. "
-                    "Output the original script characters as-is."
-                )
-            elif language_hint == "mixed":
-                ocr_user_instruction = (
-                    "This document contains MIXED languages (e.g. English + an Indian vernacular script). "
-                    "Extract ALL text for EVERY language segment, preserving each script exactly as it appears. "
-                    "Do not skip or transliterate any vernacular portion."
-                )
-            else:
-                ocr_user_instruction = (
-                    "Extract all text from this legal document image. "
-                    "If you detect any Indic or vernacular script (Devanagari, Tamil, Telugu, Kannada, "
-                    "Malayalam, Bengali, Gujarati, Gurmukhi, Odia, Perso-Arabic/Urdu), preserve every "
-                    "character in its original Unicode script — do NOT transliterate."
-                )
+            ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+            mime = IMAGE_MIME_TYPES.get(ext, "image/png")
+
+            ocr_user_instruction = _ocr_user_instruction(language_hint)
 
             response = self.openai_client.chat.completions.create(
                 model="gpt-4o",
@@ -605,7 +671,7 @@ class DocumentService:
         text_lower = text.lower()
         keyword_scores = {}
         for doc_type, keywords in DOCUMENT_TYPES.items():
-            score = sum(1 for kw in keywords if kw.lower() in text_lower)
+            score = sum(1 for kw in keywords if kw in text_lower)
             if score > 0:
                 keyword_scores[doc_type] = score
 
@@ -657,7 +723,7 @@ class DocumentService:
             "ocr_engine": "gpt-4o-vision" if self._ocr_available else "unavailable",
             "image_enhancement": "pillow" if _PIL_AVAILABLE else "unavailable",
             "pdf_processing": "pymupdf" if _PYMUPDF_AVAILABLE else "unavailable",
-            "supported_formats": sorted(ALL_SUPPORTED_FORMATS),
+            "supported_formats": list(_SORTED_FORMATS),
             "max_file_size_mb": MAX_FILE_SIZE_MB,
             "max_ocr_pages": MAX_PAGES_FOR_OCR,
             "pdf_render_dpi": 300,
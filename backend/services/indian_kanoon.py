@@ -1,17 +1,45 @@
-from datetime import datetime, timedelta
+import re
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+
 from backend.config import Config
 from backend.utils.logger import setup_logger
 
 
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=8)
+def _fromdate(today: date, years: int) -> str:
+    """``fromdate`` qualifier value (DD-MM-YYYY) for the last *years* up to *today*."""
+    return (today - timedelta(days=years * 365)).strftime("%d-%m-%Y")
+
+
 class IndianKanoonAPI:
     """Client for the Indian Kanoon case-law search API.
 
     The Indian Kanoon API uses POST (form-encoded) for search and
     Token-based authentication via the Authorization header.
+
+    Successful search responses are memoised per process for
+    SEARCH_CACHE_TTL seconds — the same brief (and similar briefs) issue
+    the same queries across analyze / re-analyze / deep-dive passes.
+    Judgment excerpts are memoised the same way: those passes pick the
+    same top precedents, and each excerpt otherwise costs a full
+    judgment download.
     """
 
+    SEARCH_CACHE_TTL = 1800   # 30 minutes
+    SEARCH_CACHE_SIZE = 128   # Max cached queries before evicting the oldest
+    EXCERPT_CACHE_SIZE = 256  # Max cached excerpts (≤ ~3 KB each)
+    POOL_SIZE = 8             # Kept-alive connections (analyzer fans out 4 at a time)
+
     def __init__(self, api_key: str = None):
         self.logger = setup_logger("IndianKanoonAPI")
         self.api_key = api_key or Config.INDIAN_KANOON_API_KEY
@@ -20,6 +48,16 @@ class IndianKanoonAPI:
             "Authorization": f"Token {self.api_key}",
         }
         self._available = bool(self.api_key)
+        # One keep-alive session for every call — searches and excerpt
+        # fetches reuse pooled connections instead of paying a TCP + TLS
+        # handshake each.
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.POOL_SIZE))
+        # {sorted form items: (expires_at, response)} — monotonic clock
+        self._search_cache: Dict[tuple, Tuple[float, dict]] = {}
+        # {(doc_id, max_chars): (expires_at, excerpt)} — same TTL as searches
+        self._excerpt_cache: Dict[tuple, Tuple[float, str]] = {}
 
     @property
     def is_available(self) -> bool:
@@ -37,15 +75,29 @@ class IndianKanoonAPI:
         for k, v in kwargs.items():
             if k != "pagenum":
                 form_data[k] = v
+
+        cache_key = tuple(sorted((k, str(v)) for k, v in form_data.items()))
+        entry = self._search_cache.get(cache_key)
+        if entry is not None:
+            expires_at, cached = entry
+            if time.monotonic() < expires_at:
+                self.logger.debug("search cache hit: %s", query)
+                return cached
+            self._search_cache.pop(cache_key, None)
+
         try:
-            resp = requests.post(
+            resp = self.session.post(
                 url,
-                headers=self.headers,
                 data=form_data,
                 timeout=15,
             )
             resp.raise_for_status()
-            return resp.json()
+            data = resp.json()
+            # Only successful responses are cached; errors are retried next call
+            if len(self._search_cache) >= self.SEARCH_CACHE_SIZE:
+                self._search_cache.pop(next(iter(self._search_cache), None), None)
+            self._search_cache[cache_key] = (time.monotonic() + self.SEARCH_CACHE_TTL, data)
+            return data
         except Exception as e:
             self.logger.error("search_judgments failed: %s", e)
             return {"error": str(e)}
@@ -54,9 +106,8 @@ class IndianKanoonAPI:
         """Fetch a single document/judgment by its Indian Kanoon doc ID."""
         url = f"{self.base_url}/doc/{doc_id}/"
         try:
-            resp = requests.post(
+            resp = self.session.post(
                 url,
-                headers=self.headers,
                 timeout=15,
             )
             resp.raise_for_status()
@@ -70,24 +121,35 @@ class IndianKanoonAPI:
 
         Strips HTML, takes the tail portion (where the ratio decidendi
         and operative order typically appear), capped at *max_chars*.
-        Returns an empty string on failure.
+        Returns an empty string on failure or when the judgment has no text.
         """
-        import re as _re
+        cache_key = (doc_id, max_chars)
+        entry = self._excerpt_cache.get(cache_key)
+        if entry is not None:
+            expires_at, cached = entry
+            if time.monotonic() < expires_at:
+                return cached
+            # pop(), not del — excerpts are fetched concurrently
+            self._excerpt_cache.pop(cache_key, None)
 
         data = self.get_doc(doc_id)
-        if "error" in data or "doc" not in data:
+        if "error" in data:
             return ""
-        raw = data["doc"]
+        raw = data.get("doc") or ""
         # Strip HTML tags
-        text = _re.sub(r"<[^>]+>", " ", raw)
+        text = _HTML_TAG_RE.sub(" ", raw)
         # Collapse whitespace
-        text = _re.sub(r"\s+", " ", text).strip()
-        if not text:
-            return ""
+        text = _WHITESPACE_RE.sub(" ", text).strip()
         # Take the last `max_chars` characters — the holding / ratio
         # decidendi is almost always near the end of Indian judgments.
         if len(text) > max_chars:
             text = "…" + text[-max_chars:]
+        # A judgment that came back without text is cached as "" like any
+        # other excerpt, so it is not downloaded again on the next pass;
+        # only request failures are retried next call.
+        if len(self._excerpt_cache) >= self.EXCERPT_CACHE_SIZE:
+            self._excerpt_cache.pop(next(iter(self._excerpt_cache), None), None)
+        self._excerpt_cache[cache_key] = (time.monotonic() + self.SEARCH_CACHE_TTL, text)
         return text
 
     def search_recent(self, query: str, years: int = 3, **kwargs) -> dict:
@@ -96,8 +158,8 @@ class IndianKanoonAPI:
         Appends ``sortby:mostrecent`` and ``fromdate:DD-MM-YYYY`` qualifiers
         to the query so the API returns newest judgments first.
         """
-        cutoff = datetime.now() - timedelta(days=years * 365)
-        date_str = cutoff.strftime("%d-%m-%Y")
-        recent_query = f"{query} sortby:mostrecent fromdate:{date_str}"
-        self.logger.info("search_recent query: %s", recent_query)
+        # Only the calendar day matters, so the cutoff is formatted once per
+        # day rather than once per query.
+        recent_query = f"{query} sortby:mostrecent fromdate:{_fromdate(date.today(), years)}"
+        self.logger.debug("search_recent query: %s", recent_query)
         return self.search_judgments(recent_query, **kwargs)
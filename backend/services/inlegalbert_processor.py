@@ -16,8 +16,10 @@ Capabilities:
   - Key-phrase extraction
 """
 
+import heapq
 import os
 import re
+from types import MappingProxyType
 from typing import Any, Dict, List, Optional
 from backend.utils.logger import setup_logger
 
@@ -34,6 +36,84 @@ except ImportError:
     logger.info("Transformers not installed — using keyword-based NLP fallback")
 
 
+# ──────────────────────────────────────────────────────────────────────
+# Keyword-fallback reference data (built once at import)
+# ──────────────────────────────────────────────────────────────────────
+
+LEGAL_PHRASES = (
+    "prima facie", "res judicata", "locus standi", "obiter dicta",
+    "ratio decidendi", "stare decisis", "mens rea", "actus reus",
+    "ultra vires", "intra vires", "sub judice", "ex parte",
+    "inter alia", "ipso facto", "de novo", "ad interim",
+    "sine die", "mutatis mutandis", "ab initio", "bona fide",
+    "mala fide", "amicus curiae", "in limine", "suo motu",
+    "fundamental right", "natural justice", "due process",
+    "reasonable restriction", "public interest", "burden of proof",
+    "preponderance of probability", "beyond reasonable doubt",
+    "cause of action", "limitation period", "territorial jurisdiction",
+    "pecuniary jurisdiction", "original jurisdiction",
+    "appellate jurisdiction", "inherent powers", "suo motu cognizance",
+    "anticipatory bail", "regular bail", "default bail",
+    "interim relief", "specific performance", "injunction",
+    "mandatory injunction", "prohibitory injunction",
+    "decree", "judgment", "order", "writ petition",
+    "special leave petition", "civil revision", "criminal revision",
+    "first information report", "charge sheet", "final report",
+)
+
+LEGAL_DOMAINS = MappingProxyType({
+    "Criminal Law": ("accused", "offence", "crime", "fir", "bail", "arrest",
+                     "prosecution", "ipc", "bns", "crpc", "bnss", "murder",
+                     "theft", "cheating", "forgery"),
+    "Civil Law": ("plaintiff", "defendant", "suit", "decree", "injunction",
+                  "damages", "cpc", "specific performance"),
+    "Constitutional Law": ("fundamental", "article", "writ", "constitution",
+                           "constitutional", "supreme court"),
+    "Corporate Law": ("company", "director", "shareholder", "nclt",
+                      "insolvency", "winding up", "companies act"),
+    "Family Law": ("divorce", "maintenance", "custody", "marriage",
+                   "matrimonial", "domestic violence"),
+    "Property Law": ("property", "land", "possession", "title deed",
+                     "easement", "partition"),
+    "Labour Law": ("employee", "employer", "wages", "retrenchment",
+                   "industrial dispute", "workman"),
+    "Tax Law": ("income tax", "gst", "assessment", "tribunal",
+                "tax evasion", "revenue"),
+    "Environmental Law": ("environment", "pollution", "ngt",
+                          "green tribunal", "wildlife"),
+    "Consumer Law": ("consumer", "deficiency", "service", "goods",
+                     "unfair trade", "complaint"),
+})
+
+ADVERSARIAL_WORDS = ("illegal", "unlawful", "fraud", "mala fide",
+                     "abuse", "violation", "contravention", "breach",
+                     "malicious", "oppressive", "arbitrary")
+COOPERATIVE_WORDS = ("mediation", "settlement", "compromise",
+                     "conciliation", "mutual", "amicable",
+                     "agreed", "consent")
+
+_SECTION_PHRASE_RE = re.compile(r'Section\s+\d+[A-Za-z]?\s+(?:of\s+)?(?:the\s+)?[A-Z][A-Za-z\s]+(?:Act|Code)')
+_COURT_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r"(?:Hon'ble\s+)?Supreme\s+Court(?:\s+of\s+India)?",
+    r"(?:Hon'ble\s+)?High\s+Court\s+of\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*",
+    r"(?:District|Sessions|Magistrate|Family)\s+Court",
+    r"(?:NCLT|NGT|DRT|MACT|ITAT|NCLAT|SAT|NCDRC|SCDRC)",
+))
+_JUDGE_PATTERN = re.compile(
+    r"(?:Justice|Hon'ble\s+(?:Mr\.|Mrs\.|Ms\.)\s+Justice)\s+[A-Z][a-z]+(?:\s+[A-Z]\.?\s*)*[A-Z][a-z]+"
+)
+_ACT_PATTERN = re.compile(r'(?:The\s+)?[A-Z][A-Za-z\s]+(?:Act|Code|Rules|Regulations|Order),?\s*(?:19|20)\d{2}')
+_GOV_BODY_PATTERN = re.compile(
+    r'(?:Union|State|Central)\s+(?:of\s+India|Government)|(?:Ministry|Department)\s+of\s+[A-Z][A-Za-z\s]+'
+)
+
+# Complexity signals
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+_SECTION_REF_RE = re.compile(r'Section\s+\d+', re.IGNORECASE)
+_ACT_YEAR_RE = re.compile(r'(?:Act|Code),?\s*(?:19|20)\d{2}')
+_VERSUS_RE = re.compile(r'\b(?:v\.?s?\.?|versus)\b', re.IGNORECASE)
+
+
 class InLegalBERTProcessor:
     """
     Process Indian legal text with InLegalBERT (or keyword fallback).
@@ -105,33 +185,12 @@ class InLegalBERTProcessor:
         phrases = set()
         text_lower = text.lower()
 
-        legal_phrases = [
-            "prima facie", "res judicata", "locus standi", "obiter dicta",
-            "ratio decidendi", "stare decisis", "mens rea", "actus reus",
-            "ultra vires", "intra vires", "sub judice", "ex parte",
-            "inter alia", "ipso facto", "de novo", "ad interim",
-            "sine die", "mutatis mutandis", "ab initio", "bona fide",
-            "mala fide", "amicus curiae", "in limine", "suo motu",
-            "fundamental right", "natural justice", "due process",
-            "reasonable restriction", "public interest", "burden of proof",
-            "preponderance of probability", "beyond reasonable doubt",
-            "cause of action", "limitation period", "territorial jurisdiction",
-            "pecuniary jurisdiction", "original jurisdiction",
-            "appellate jurisdiction", "inherent powers", "suo motu cognizance",
-            "anticipatory bail", "regular bail", "default bail",
-            "interim relief", "specific performance", "injunction",
-            "mandatory injunction", "prohibitory injunction",
-            "decree", "judgment", "order", "writ petition",
-            "special leave petition", "civil revision", "criminal revision",
-            "first information report", "charge sheet", "final report",
-        ]
-
-        for phrase in legal_phrases:
+        for phrase in LEGAL_PHRASES:
             if phrase in text_lower:
                 phrases.add(phrase.title())
 
         # Extract Section/Article references as phrases
-        sections = re.findall(r'Section\s+\d+[A-Za-z]?\s+(?:of\s+)?(?:the\s+)?[A-Z][A-Za-z\s]+(?:Act|Code)', text)
+        sections = _SECTION_PHRASE_RE.findall(text)
         phrases.update(s.strip() for s in sections[:10])
 
         return sorted(phrases)
@@ -149,33 +208,17 @@ class InLegalBERTProcessor:
         }
 
         # Courts
-        court_patterns = [
-            r"(?:Hon'ble\s+)?Supreme\s+Court(?:\s+of\s+India)?",
-            r"(?:Hon'ble\s+)?High\s+Court\s+of\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*",
-            r"(?:District|Sessions|Magistrate|Family)\s+Court",
-            r"(?:NCLT|NGT|DRT|MACT|ITAT|NCLAT|SAT|NCDRC|SCDRC)",
-        ]
-        for pat in court_patterns:
-            matches = re.findall(pat, text, re.IGNORECASE)
-            entities["courts"].extend(set(matches))
+        for pattern in _COURT_PATTERNS:
+            entities["courts"].extend(set(pattern.findall(text)))
 
         # Judges
-        judge_patterns = [
-            r"(?:Justice|Hon'ble\s+(?:Mr\.|Mrs\.|Ms\.)\s+Justice)\s+[A-Z][a-z]+(?:\s+[A-Z]\.?\s*)*[A-Z][a-z]+",
-        ]
-        for pat in judge_patterns:
-            matches = re.findall(pat, text)
-            entities["judges"].extend(set(matches))
+        entities["judges"].extend(set(_JUDGE_PATTERN.findall(text)))
 
         # Statutes / Acts
-        act_pattern = r'(?:The\s+)?[A-Z][A-Za-z\s]+(?:Act|Code|Rules|Regulations|Order),?\s*(?:19|20)\d{2}'
-        act_matches = re.findall(act_pattern, text)
-        entities["statutes"] = list(set(m.strip() for m in act_matches))
+        entities["statutes"] = list(set(m.strip() for m in _ACT_PATTERN.findall(text)))
 
         # Government bodies
-        gov_pattern = r'(?:Union|State|Central)\s+(?:of\s+India|Government)|(?:Ministry|Department)\s+of\s+[A-Z][A-Za-z\s]+'
-        gov_matches = re.findall(gov_pattern, text)
-        entities["government_bodies"] = list(set(m.strip() for m in gov_matches))
+        entities["government_bodies"] = list(set(m.strip() for m in _GOV_BODY_PATTERN.findall(text)))
 
         return entities
 
@@ -184,32 +227,9 @@ class InLegalBERTProcessor:
     def _classify_domain(self, text: str) -> List[Dict[str, Any]]:
         """Classify text into legal domain tags with confidence."""
         text_lower = text.lower()
-        domains = {
-            "Criminal Law": ["accused", "offence", "crime", "fir", "bail", "arrest",
-                              "prosecution", "ipc", "bns", "crpc", "bnss", "murder",
-                              "theft", "cheating", "forgery"],
-            "Civil Law": ["plaintiff", "defendant", "suit", "decree", "injunction",
-                           "damages", "cpc", "specific performance"],
-            "Constitutional Law": ["fundamental", "article", "writ", "constitution",
-                                    "constitutional", "supreme court"],
-            "Corporate Law": ["company", "director", "shareholder", "nclt",
-                               "insolvency", "winding up", "companies act"],
-            "Family Law": ["divorce", "maintenance", "custody", "marriage",
-                            "matrimonial", "domestic violence"],
-            "Property Law": ["property", "land", "possession", "title deed",
-                              "easement", "partition"],
-            "Labour Law": ["employee", "employer", "wages", "retrenchment",
-                            "industrial dispute", "workman"],
-            "Tax Law": ["income tax", "gst", "assessment", "tribunal",
-                         "tax evasion", "revenue"],
-            "Environmental Law": ["environment", "pollution", "ngt",
-                                   "green tribunal", "wildlife"],
-            "Consumer Law": ["consumer", "deficiency", "service", "goods",
-                              "unfair trade", "complaint"],
-        }
 
         results = []
-        for domain, keywords in domains.items():
+        for domain, keywords in LEGAL_DOMAINS.items():
             score = sum(1 for kw in keywords if kw in text_lower)
             if score > 0:
                 results.append({
@@ -218,8 +238,8 @@ class InLegalBERTProcessor:
                     "keyword_hits": score,
                 })
 
-        results.sort(key=lambda x: x["confidence"], reverse=True)
-        return results[:5]
+        # Top 5 only — same order as a stable descending sort, without sorting all
+        return heapq.nlargest(5, results, key=lambda x: x["confidence"])
 
     # ── Sentiment Analysis ─────────────────────────────────────────
 
@@ -227,15 +247,8 @@ class InLegalBERTProcessor:
         """Assess overall tone — adversarial, neutral, or cooperative."""
         text_lower = text.lower()
 
-        adversarial_words = ["illegal", "unlawful", "fraud", "mala fide",
-                              "abuse", "violation", "contravention", "breach",
-                              "malicious", "oppressive", "arbitrary"]
-        cooperative_words = ["mediation", "settlement", "compromise",
-                              "conciliation", "mutual", "amicable",
-                              "agreed", "consent"]
-
-        adv_count = sum(1 for w in adversarial_words if w in text_lower)
-        coop_count = sum(1 for w in cooperative_words if w in text_lower)
+        adv_count = sum(1 for w in ADVERSARIAL_WORDS if w in text_lower)
+        coop_count = sum(1 for w in COOPERATIVE_WORDS if w in text_lower)
 
         if adv_count > coop_count + 2:
             tone = "adversarial"
@@ -255,14 +268,14 @@ class InLegalBERTProcessor:
     def _assess_complexity(self, text: str) -> Dict[str, Any]:
         """Score the legal complexity of the brief."""
         words = text.split()
-        sentences = re.split(r'[.!?]+', text)
+        sentences = _SENTENCE_SPLIT_RE.split(text)
         word_count = len(words)
         sentence_count = max(len([s for s in sentences if s.strip()]), 1)
         avg_sentence_len = word_count / sentence_count
 
-        sections_mentioned = len(re.findall(r'Section\s+\d+', text, re.IGNORECASE))
-        acts_mentioned = len(re.findall(r'(?:Act|Code),?\s*(?:19|20)\d{2}', text))
-        parties_count = len(re.findall(r'\b(?:v\.?s?\.?|versus)\b', text, re.IGNORECASE))
+        sections_mentioned = len(_SECTION_REF_RE.findall(text))
+        acts_mentioned = len(_ACT_YEAR_RE.findall(text))
+        parties_count = len(_VERSUS_RE.findall(text))
 
         # Complexity score 1-10
         complexity = min(10, max(1,
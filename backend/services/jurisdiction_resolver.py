@@ -33,6 +33,36 @@ from backend.utils.logger import setup_logger
 logger = setup_logger("JurisdictionResolver")
 
 
+def _trie_pattern(words) -> str:
+    """
+    Render *words* as one regex alternation factored into a prefix trie.
+
+    A flat ``a|b|c`` alternation of ~1,100 place names makes the engine
+    retry every name at every word boundary; the trie form shares each
+    prefix, so a position is rejected after a character or two.  Optional
+    tails are greedy, so the longest name matching at a position wins —
+    the same result as a flat alternation sorted longest-first.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}  # end-of-word marker
+
+    def render(node: Dict[str, dict]) -> str:
+        branches = [re.escape(ch) + render(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if len(branches) == 1:
+            body = branches[0]
+            return f"(?:{body})?" if "" in node else body
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if "" in node else body
+
+    return render(trie)
+
+
 class JurisdictionResolver:
     """
     Resolve Indian place names in legal text to authoritative
@@ -56,26 +86,24 @@ class JurisdictionResolver:
         for place_lower, dist_lower in PLACE_TO_DISTRICT.items():
             self._place_lookup[place_lower] = dist_lower
 
-        # Build sorted list of place names by length (longest first)
-        # to match "North Paravur" before "Paravur"
-        self._sorted_place_names = sorted(
-            self._place_lookup.keys(), key=len, reverse=True
-        )
-
-        # Pre-compile a single regex for efficient scanning
-        # Escape place names and join with alternation
-        escaped = [re.escape(p) for p in self._sorted_place_names]
+        # Pre-compile a single regex for efficient scanning, shaped as a
+        # prefix trie of the place names (see _trie_pattern) so "North
+        # Paravur" still wins over "Paravur".  Keys and the scanned text
+        # are both lowercase, so the pattern is compiled case-sensitive.
         # Only compile if we have entries
-        if escaped:
+        if self._place_lookup:
             self._pattern = re.compile(
-                r'\b(' + '|'.join(escaped) + r')\b',
-                re.IGNORECASE
+                r'\b(' + _trie_pattern(self._place_lookup) + r')\b'
             )
         else:
             self._pattern = None
 
-        # Also build a state name lookup for direct state mentions
+        # Also build a state name lookup for direct state mentions, plus one
+        # alternation regex so the text is scanned once instead of once per state
         self._state_names = {s.lower(): s for s in STATE_INFO}
+        self._state_pattern = re.compile('|'.join(
+            re.escape(s) for s in sorted(self._state_names, key=len, reverse=True)
+        ))
 
         logger.info(
             "JurisdictionResolver ready — %d places, %d districts, %d states",
@@ -107,7 +135,7 @@ class JurisdictionResolver:
         # 1. Try regex matching for all known place names
         if self._pattern:
             for m in self._pattern.finditer(text_lower):
-                place = m.group(1).lower().strip()
+                place = m.group(1)  # already lowercase — scanned text_lower against lowercase keys
                 dist_lower = self._place_lookup.get(place)
                 if dist_lower and dist_lower not in seen_districts:
                     dist_info = DISTRICT_REGISTRY.get(dist_lower)
@@ -122,11 +150,12 @@ class JurisdictionResolver:
                             "district_court": dist_info["district_court"],
                         })
 
-        # 2. Also check for direct state name mentions
-        state_mentions = []
-        for state_lower, state_proper in self._state_names.items():
-            if state_lower in text_lower:
-                state_mentions.append(state_proper)
+        # 2. Also check for direct state name mentions (reported in STATE_INFO order)
+        found_states = {m.group(0) for m in self._state_pattern.finditer(text_lower)}
+        state_mentions = [
+            state_proper for state_lower, state_proper in self._state_names.items()
+            if state_lower in found_states
+        ] if found_states else []
 
         if not matches:
             # No place matched — check if a state was at least mentioned
@@ -15,14 +15,15 @@ Architecture:
 """
 
 import io
+import math
 import os
 import re
 import time
 import tempfile
 from typing import Any, Dict, List, Optional, Tuple
-from difflib import SequenceMatcher
 
 from backend.config import Config
+from backend.services.api_clients import get_anthropic_client, get_openai_client
 from backend.utils.logger import setup_logger
 from backend.data.legal_vocabulary import (
     build_whisper_prompt,
@@ -90,6 +91,44 @@ CORRECTION_SYSTEM_PROMPT = """You are a legal transcript corrector specialising
 If no corrections are needed, return the original text with empty arrays."""
 
 
+# ──────────────────────────────────────────────────────────────────
+# Rule-based correction patterns (compiled once at import)
+# ──────────────────────────────────────────────────────────────────
+
+# (pattern, correct term) in vocabulary order — applied sequentially
+_MISRECOGNITION_PATTERNS = tuple(
+    (re.compile(re.escape(variant), re.IGNORECASE), correct_term)
+    for correct_term, variants in COMMON_MISRECOGNITIONS.items()
+    for variant in variants
+)
+
+# "section 3 0 2" → "Section 302", "section 4 9 8 a" → "Section 498A"
+_SECTION_3_DIGIT_RE = re.compile(r'\bsection\s+(\d)\s+(\d)\s+(\d)\b', re.IGNORECASE)
+_SECTION_3_DIGIT_SUFFIX_RE = re.compile(r'\bsection\s+(\d)\s+(\d)\s+(\d)\s+([a-zA-Z])\b', re.IGNORECASE)
+_ARTICLE_2_DIGIT_RE = re.compile(r'\barticle\s+(\d)\s+(\d)\b', re.IGNORECASE)
+_ARTICLE_3_DIGIT_RE = re.compile(r'\barticle\s+(\d)\s+(\d)\s+(\d)\b', re.IGNORECASE)
+
+# Key legal abbreviations, capitalised in a single pass
+_LEGAL_CAPS = {
+    "fir": "FIR", "crpc": "CrPC", "ipc": "IPC", "cpc": "CPC",
+    "bns": "BNS", "bnss": "BNSS", "bsa": "BSA", "scc": "SCC", "slp": "SLP",
+    "nclt": "NCLT", "nclat": "NCLAT", "rera": "RERA", "ngt": "NGT",
+}
+_LEGAL_CAPS_RE = re.compile(r'\b(' + '|'.join(_LEGAL_CAPS) + r')\b', re.IGNORECASE)
+
+
+def _segment_confidence(avg_logprob: float, no_speech: float) -> float:
+    """0-1 confidence for one Whisper segment."""
+    # Convert log probability to a 0-1 confidence score
+    # avg_logprob is typically between -2.0 (low) and 0 (high)
+    confidence = min(1.0, max(0.0, math.exp(avg_logprob)))
+
+    # Penalise high no-speech probability
+    if no_speech > 0.5:
+        confidence *= (1.0 - no_speech)
+    return confidence
+
+
 class SpeechService:
     """
     Enterprise speech-to-text service for legal dictation.
@@ -101,7 +140,8 @@ class SpeechService:
     WHISPER_MODEL = "whisper-1"
     CORRECTION_MODEL = "claude-sonnet-4-20250514"
     MAX_AUDIO_SIZE_MB = 25  # Whisper limit
-    SUPPORTED_FORMATS = {"wav", "flac", "mp3", "mp4", "mpeg", "mpga", "m4a", "ogg", "webm"}
+    SUPPORTED_FORMATS = frozenset({"wav", "flac", "mp3", "mp4", "mpeg", "mpga", "m4a", "ogg", "webm"})
+    _SORTED_FORMATS = tuple(sorted(SUPPORTED_FORMATS))
 
     def __init__(self):
         self.openai_client = None
@@ -113,7 +153,7 @@ class SpeechService:
         openai_key = Config.OPENAI_API_KEY if hasattr(Config, 'OPENAI_API_KEY') else os.environ.get('OPENAI_API_KEY')
         if _OPENAI_AVAILABLE and openai_key:
             try:
-                self.openai_client = openai.OpenAI(api_key=openai_key)
+                self.openai_client = get_openai_client(openai_key)
                 self._whisper_available = True
                 logger.info("Whisper STT service initialised")
             except Exception as e:
@@ -128,7 +168,7 @@ class SpeechService:
         claude_key = Config.CLAUDE_API_KEY
         if _ANTHROPIC_AVAILABLE and claude_key:
             try:
-                self.anthropic_client = anthropic.Anthropic(api_key=claude_key)
+                self.anthropic_client = get_anthropic_client(claude_key)
                 self._correction_available = True
                 logger.info("Claude correction layer initialised")
             except Exception as e:
@@ -193,7 +233,7 @@ class SpeechService:
         ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else "wav"
         if ext not in self.SUPPORTED_FORMATS:
             return {
-                "error": f"Unsupported audio format: .{ext}. Use: {', '.join(sorted(self.SUPPORTED_FORMATS))}",
+                "error": f"Unsupported audio format: .{ext}. Use: {', '.join(self._SORTED_FORMATS)}",
                 "status": "invalid_format",
             }
 
@@ -347,61 +387,32 @@ class SpeechService:
         """
         corrected = text
 
-        # Fix known misrecognitions using fuzzy matching
-        for correct_term, variants in COMMON_MISRECOGNITIONS.items():
-            for variant in variants:
-                # Case-insensitive replacement
-                pattern = re.compile(re.escape(variant), re.IGNORECASE)
-                corrected = pattern.sub(correct_term, corrected)
+        # Fix known misrecognitions (case-insensitive)
+        for pattern, correct_term in _MISRECOGNITION_PATTERNS:
+            corrected = pattern.sub(correct_term, corrected)
 
         # Fix section number formatting
-        # "section 3 0 2" → "Section 302"
-        corrected = re.sub(
-            r'\bsection\s+(\d)\s+(\d)\s+(\d)\b',
+        corrected = _SECTION_3_DIGIT_RE.sub(
             lambda m: f"Section {m.group(1)}{m.group(2)}{m.group(3)}",
             corrected,
-            flags=re.IGNORECASE,
         )
-        # "section 4 9 8 a" → "Section 498A"
-        corrected = re.sub(
-            r'\bsection\s+(\d)\s+(\d)\s+(\d)\s+([a-zA-Z])\b',
+        corrected = _SECTION_3_DIGIT_SUFFIX_RE.sub(
             lambda m: f"Section {m.group(1)}{m.group(2)}{m.group(3)}{m.group(4).upper()}",
             corrected,
-            flags=re.IGNORECASE,
         )
 
         # Fix article number formatting
-        corrected = re.sub(
-            r'\barticle\s+(\d)\s+(\d)\b',
+        corrected = _ARTICLE_2_DIGIT_RE.sub(
             lambda m: f"Article {m.group(1)}{m.group(2)}",
             corrected,
-            flags=re.IGNORECASE,
         )
-        corrected = re.sub(
-            r'\barticle\s+(\d)\s+(\d)\s+(\d)\b',
+        corrected = _ARTICLE_3_DIGIT_RE.sub(
             lambda m: f"Article {m.group(1)}{m.group(2)}{m.group(3)}",
             corrected,
-            flags=re.IGNORECASE,
         )
 
         # Capitalise key legal terms
-        legal_caps = {
-            r'\b(fir)\b': 'FIR',
-            r'\b(crpc)\b': 'CrPC',
-            r'\b(ipc)\b': 'IPC',
-            r'\b(cpc)\b': 'CPC',
-            r'\b(bns)\b': 'BNS',
-            r'\b(bnss)\b': 'BNSS',
-            r'\b(bsa)\b': 'BSA',
-            r'\b(scc)\b': 'SCC',
-            r'\b(slp)\b': 'SLP',
-            r'\b(nclt)\b': 'NCLT',
-            r'\b(nclat)\b': 'NCLAT',
-            r'\b(rera)\b': 'RERA',
-            r'\b(ngt)\b': 'NGT',
-        }
-        for pattern, replacement in legal_caps.items():
-            corrected = re.sub(pattern, replacement, corrected, flags=re.IGNORECASE)
+        corrected = _LEGAL_CAPS_RE.sub(lambda m: _LEGAL_CAPS[m.group(1).lower()], corrected)
 
         return corrected
 
@@ -465,15 +476,7 @@ class SpeechService:
             avg_logprob = seg.get("avg_logprob", 0)
             no_speech = seg.get("no_speech_prob", 0)
 
-            # Convert log probability to a 0-1 confidence score
-            # avg_logprob is typically between -2.0 (low) and 0 (high)
-            import math
-            confidence = min(1.0, max(0.0, math.exp(avg_logprob)))
-
-            # Penalise high no-speech probability
-            if no_speech > 0.5:
-                confidence *= (1.0 - no_speech)
-
+            confidence = _segment_confidence(avg_logprob, no_speech)
             level = "high" if confidence > 0.8 else "medium" if confidence > 0.5 else "low"
 
             scored.append({
@@ -495,6 +498,6 @@ class SpeechService:
             "correction_layer": "ready" if self._correction_available else "unavailable",
             "whisper_model": self.WHISPER_MODEL,
             "correction_model": self.CORRECTION_MODEL if self._correction_available else None,
-            "supported_formats": sorted(self.SUPPORTED_FORMATS),
+            "supported_formats": list(self._SORTED_FORMATS),
             "max_file_size_mb": self.MAX_AUDIO_SIZE_MB,
         }
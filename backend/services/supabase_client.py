@@ -1,4 +1,5 @@
-import os
+from functools import lru_cache
+
 from supabase import create_client, Client
 from backend.config import Config
 from backend.utils.logger import setup_logger
@@ -18,10 +19,19 @@ class SupabaseClient:
             try:
                 self.client = create_client(self.url, self.key)
             except Exception as e:
-                self.logger.error(f"Supabase client init error: {e}")
+                self.logger.error("Supabase client init error: %s", e)
         anon_key = Config.SUPABASE_ANON_PUBLIC_KEY
         if self.url and anon_key:
+            # Always its own client, even when the main one also uses the anon
+            # key: a sign-in rewrites the signing client's Authorization header
+            # to the user's JWT, which must never leak into shared data queries.
             try:
                 self.auth_client = create_client(self.url, anon_key)
             except Exception as e:
-                self.logger.error(f"Supabase auth client init error: {e}")
+                self.logger.error("Supabase auth client init error: %s", e)
+
+
+@lru_cache(maxsize=1)
+def get_supabase_client() -> SupabaseClient:
+    """Process-wide SupabaseClient built from Config (one set of connections per worker)."""
+    return SupabaseClient()
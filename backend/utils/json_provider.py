@@ -0,0 +1,54 @@
+"""
+LexAssist — orjson JSON Provider
+=================================
+Flask JSON provider backed by ``orjson`` when it is installed.
+
+Analysis payloads (entities, statutes, precedents, the full AI analysis)
+are large nested dicts, and serialising them with the stdlib encoder is
+pure interpreter work on every response.  orjson does the same walk in
+native code.
+
+Differences from Flask's default provider: keys are not sorted, non-ASCII
+text (Indic scripts) is emitted as UTF-8 rather than ``\\uXXXX`` escapes,
+and ``datetime``/``date`` values are serialised natively as ISO-8601
+rather than passed to ``default`` (Flask's RFC 822 ``http_date``).  Payloads
+that carry dates should convert them before returning, so the output does
+not depend on whether orjson is installed.  Anything orjson cannot encode —
+or any call asking for options it has no equivalent for, such as
+``indent`` — falls back to the stdlib path.
+"""
+
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """``app.json = ORJSONProvider(app)`` — only install when ORJSON_AVAILABLE."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Flask passes compact separators for normal responses; orjson's
+        # output is always compact, so that option needs no translation.
+        separators = kwargs.pop("separators", None)
+        default = kwargs.pop("default", self.default)
+        if not kwargs:
+            try:
+                return orjson.dumps(
+                    obj, default=default, option=orjson.OPT_NON_STR_KEYS,
+                ).decode("utf-8")
+            except (orjson.JSONEncodeError, TypeError):
+                pass
+        if separators is not None:
+            kwargs["separators"] = separators
+        return super().dumps(obj, default=default, **kwargs)
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
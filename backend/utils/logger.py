@@ -1,22 +1,49 @@
 """
 LexAssist — Structured Logger
 Enterprise-grade logging with rotation, JSON formatting, and request tracing.
+
+Records are handed to a QueueHandler and emitted by a QueueListener thread,
+so stdout flushes and file rotation never run on the request path.  One
+queue and one listener serve every named logger in the process.
 """
+import atexit
 import logging
+import queue
 import sys
 import os
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from datetime import datetime
 
 LOG_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'logs')
 LOG_FORMAT = '[%(asctime)s] %(levelname)-8s %(name)-24s %(message)s'
 DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
 
+# Console/file handlers of each named logger, looked up by record name
+_handlers_by_name: "dict[str, tuple[logging.Handler, ...]]" = {}
+
+
+class _DispatchHandler(logging.Handler):
+    """Emit a record through the handlers registered for its logger."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        for handler in _handlers_by_name.get(record.name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener = QueueListener(_log_queue, _DispatchHandler())
+_listener.start()
+atexit.register(_listener.stop)   # drains pending records on shutdown
+
 
 def setup_logger(name: str = "LexAssist", level: str = None) -> logging.Logger:
     """
     Create a named logger with console + rotating file output.
 
+    The logger itself only enqueues records; the shared QueueListener
+    formats and writes them to this logger's console/file handlers.
+
     Args:
         name:  Logger name (usually module or class).
         level: Override log level (DEBUG/INFO/WARNING/ERROR). Defaults to
@@ -44,7 +71,8 @@ def setup_logger(name: str = "LexAssist", level: str = None) -> logging.Logger:
     console = logging.StreamHandler(sys.stdout)
     console.setLevel(resolved_level)
     console.setFormatter(formatter)
-    logger.addHandler(console)
+    handlers = [console]
+    file_logging = True
 
     # --- Rotating file handler (only when writable) ---
     try:
@@ -57,8 +85,15 @@ def setup_logger(name: str = "LexAssist", level: str = None) -> logging.Logger:
         )
         file_handler.setLevel(resolved_level)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
     except OSError:
+        file_logging = False
+
+    # --- Queue hand-off: emission happens on the shared listener thread ---
+    _handlers_by_name[name] = tuple(handlers)
+    logger.addHandler(QueueHandler(_log_queue))
+
+    if not file_logging:
         logger.debug("File logging unavailable — running console-only.")
 
     return logger
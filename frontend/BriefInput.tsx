@@ -47,6 +47,7 @@ const BriefInput: React.FC<BriefInputProps> = ({ isLoggedIn, onBriefChange, onOp
   const [lastScanResult, setLastScanResult] = useState<DocumentScanResult | null>(null);
   const [showDocScanner, setShowDocScanner] = useState(false);
   const [deepDiveStatus, setDeepDiveStatus] = useState<'idle' | 'running' | 'complete' | 'error'>('idle');
+  const [deepDiveError, setDeepDiveError] = useState<string | null>(null);
   const timerRef = useRef<ReturnType<typeof setInterval> | null>(null);
   const deepDivePollRef = useRef<ReturnType<typeof setInterval> | null>(null);
   const recognitionRef = useRef<any>(null);
@@ -131,6 +132,7 @@ const BriefInput: React.FC<BriefInputProps> = ({ isLoggedIn, onBriefChange, onOp
   const startDeepDive = async () => {
     if (!aiResult?.brief_id) return;
     try {
+      setDeepDiveError(null);
       setDeepDiveStatus('running');
       await triggerDeepDive(aiResult.brief_id, aiResult.case_id);
 
@@ -164,7 +166,9 @@ const BriefInput: React.FC<BriefInputProps> = ({ isLoggedIn, onBriefChange, onOp
           // Transient poll error — keep polling
         }
       }, 8000);
-    } catch {
+    } catch (err) {
+      // e.g. the server's deep-dive backlog is full — say so instead of a generic failure
+      setDeepDiveError((err as Error).message || null);
       setDeepDiveStatus('error');
     }
   };
@@ -589,7 +593,7 @@ const BriefInput: React.FC<BriefInputProps> = ({ isLoggedIn, onBriefChange, onOp
                   <div className="flex items-center gap-3">
                     <span className="text-red-500 text-xl flex-shrink-0">⚠</span>
                     <div>
-                      <div className="font-medium text-red-800 text-sm">Deep analysis encountered an error</div>
+                      <div className="font-medium text-red-800 text-sm">{deepDiveError || 'Deep analysis encountered an error'}</div>
                       <div className="text-xs text-red-600">The preliminary results below are still valid.</div>
                     </div>
                   </div>
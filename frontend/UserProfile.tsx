@@ -30,7 +30,7 @@ interface HistoryEntry {
 interface CaseDetail {
   activity: any;
   brief: { id: string; title: string; content: string; created_at: string } | null;
-  analysis: { id: string; analysis: any; law_sections: any; case_histories: any; created_at: string } | null;
+  analysis: { id: string; analysis: any; created_at: string } | null;
 }
 
 const ACTION_LABELS: Record<string, string> = {
@@ -0,0 +1,18 @@
+-- ═══════════════════════════════════════════════════════════════════
+-- LexAssist — Migration 008: Activity stats aggregation RPC  (idempotent)
+-- Run in Supabase Dashboard > SQL Editor > New Query
+-- ═══════════════════════════════════════════════════════════════════
+
+-- 1. Per-action counts for one user, grouped in Postgres.
+--    /api/user/stats calls this via supabase.rpc() so only one row per
+--    distinct action crosses the wire instead of the user's whole history.
+--    SECURITY INVOKER (the default) — RLS on activity_log still applies.
+CREATE OR REPLACE FUNCTION public.activity_action_counts(p_user_id uuid)
+RETURNS TABLE (action text, total bigint) AS $$
+  SELECT a.action, count(*)::bigint
+  FROM public.activity_log a
+  WHERE a.user_id = p_user_id
+  GROUP BY a.action;
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION public.activity_action_counts(uuid) TO authenticated, service_role;
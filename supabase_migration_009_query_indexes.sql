@@ -0,0 +1,27 @@
+-- ═══════════════════════════════════════════════════════════════════
+-- LexAssist — Migration 009: Composite indexes for hot queries  (idempotent)
+-- Run in Supabase Dashboard > SQL Editor > New Query
+-- ═══════════════════════════════════════════════════════════════════
+-- The existing single-column indexes let Postgres find a user's rows but
+-- not return them in order, so every listing sorts the filtered set in
+-- memory before applying LIMIT / range.  These composite indexes match
+-- each endpoint's filter + ORDER BY so the planner can walk the index in
+-- order and stop at the page boundary.
+
+-- 1. /api/user/history — activity_log WHERE user_id ORDER BY created_at DESC LIMIT n
+--    (also serves the activity_action_counts RPC and the stats HEAD counts)
+CREATE INDEX IF NOT EXISTS idx_activity_user_created
+  ON public.activity_log(user_id, created_at DESC);
+
+-- 2. /api/cases — cases WHERE user_id ORDER BY updated_at DESC
+CREATE INDEX IF NOT EXISTS idx_cases_user_updated
+  ON public.cases(user_id, updated_at DESC);
+
+-- 3. Case diary / deep-dive status — analysis_results WHERE brief_id
+--    ORDER BY created_at DESC LIMIT 1
+CREATE INDEX IF NOT EXISTS idx_analysis_brief_created
+  ON public.analysis_results(brief_id, created_at DESC);
+
+-- 4. Case diary timeline — briefs WHERE case_id ORDER BY created_at
+CREATE INDEX IF NOT EXISTS idx_briefs_case_created
+  ON public.briefs(case_id, created_at);
@@ -0,0 +1,37 @@
+-- ═══════════════════════════════════════════════════════════════════
+-- LexAssist — Migration 010: Server-side case deletion RPC  (idempotent)
+-- Run in Supabase Dashboard > SQL Editor > New Query
+-- ═══════════════════════════════════════════════════════════════════
+
+-- 1. Delete a case and everything filed under it in one round trip.
+--    DELETE /api/cases/<id> used to pull every brief id of the case to the
+--    client only to send the same list back in an IN (...) filter; the
+--    brief set is resolved here with a sub-select instead, and nothing but
+--    the found / not-found flag crosses the wire.
+--    Order matters: briefs.case_id and analysis_results.brief_id are
+--    ON DELETE SET NULL, so children are removed explicitly first
+--    (case_documents cascades from cases).
+--    SECURITY INVOKER (the default) — RLS on every table still applies.
+CREATE OR REPLACE FUNCTION public.delete_case_cascade(p_case_id uuid, p_user_id uuid)
+RETURNS boolean AS $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM public.cases c WHERE c.id = p_case_id AND c.user_id = p_user_id
+  ) THEN
+    RETURN false;
+  END IF;
+
+  DELETE FROM public.analysis_results ar
+  WHERE ar.brief_id IN (SELECT b.id FROM public.briefs b WHERE b.case_id = p_case_id);
+
+  DELETE FROM public.briefs b WHERE b.case_id = p_case_id;
+
+  DELETE FROM public.activity_log a WHERE a.case_id = p_case_id;
+
+  DELETE FROM public.cases c WHERE c.id = p_case_id AND c.user_id = p_user_id;
+
+  RETURN true;
+END;
+$$ LANGUAGE plpgsql;
+
+GRANT EXECUTE ON FUNCTION public.delete_case_cascade(uuid, uuid) TO authenticated, service_role;
@@ -0,0 +1,18 @@
+-- ═══════════════════════════════════════════════════════════════════
+-- LexAssist — Migration 011: Indexes for login and folder lookups  (idempotent)
+-- Run in Supabase Dashboard > SQL Editor > New Query
+-- ═══════════════════════════════════════════════════════════════════
+-- Covers the remaining filters that had no backing index and so fell
+-- back to a sequential scan of the whole table on every call.
+
+-- 1. /api/auth/login — profiles WHERE phone = ? AND full_name ILIKE ?
+--    ILIKE cannot use a btree, but the equality on phone narrows the
+--    candidates to one or two rows before the name is compared.
+--    This endpoint is unauthenticated, so its cost must not grow with
+--    the number of users.
+CREATE INDEX IF NOT EXISTS idx_profiles_phone
+  ON public.profiles(phone);
+
+-- 2. /api/folders — case_folders WHERE user_id ORDER BY sort_order
+CREATE INDEX IF NOT EXISTS idx_case_folders_user_sort
+  ON public.case_folders(user_id, sort_order);
@@ -0,0 +1,46 @@
+-- ═══════════════════════════════════════════════════════════════════
+-- LexAssist — Migration 012: Single-call brief + analysis save RPC  (idempotent)
+-- Run in Supabase Dashboard > SQL Editor > New Query
+-- ═══════════════════════════════════════════════════════════════════
+
+-- 1. Save an analysed brief in one round trip.
+--    Every analysis endpoint wrote up to three rows one after another —
+--    the auto-created case, the brief, then the analysis — each insert
+--    waiting on the id returned by the previous one.  The chain runs here
+--    instead and only the two new ids come back.  A new case is created
+--    only when p_case_id is NULL.  Being one function call, the rows are
+--    written atomically: no brief without its analysis on a failure.
+--    SECURITY INVOKER (the default) — RLS on every table still applies.
+CREATE OR REPLACE FUNCTION public.save_brief_analysis(
+  p_user_id    uuid,
+  p_case_id    uuid,
+  p_case_title text,
+  p_case_type  text,
+  p_title      text,
+  p_content    text,
+  p_analysis   jsonb
+)
+RETURNS jsonb AS $$
+DECLARE
+  v_case_id  uuid := p_case_id;
+  v_brief_id uuid;
+BEGIN
+  IF v_case_id IS NULL THEN
+    INSERT INTO public.cases (user_id, title, status, case_type)
+    VALUES (p_user_id, p_case_title, 'active', p_case_type)
+    RETURNING id INTO v_case_id;
+  END IF;
+
+  INSERT INTO public.briefs (user_id, case_id, title, content)
+  VALUES (p_user_id, v_case_id, p_title, p_content)
+  RETURNING id INTO v_brief_id;
+
+  INSERT INTO public.analysis_results (user_id, brief_id, analysis)
+  VALUES (p_user_id, v_brief_id, p_analysis);
+
+  RETURN jsonb_build_object('case_id', v_case_id, 'brief_id', v_brief_id);
+END;
+$$ LANGUAGE plpgsql;
+
+GRANT EXECUTE ON FUNCTION public.save_brief_analysis(uuid, uuid, text, text, text, text, jsonb)
+  TO authenticated, service_role;
@@ -0,0 +1,18 @@
+-- ═══════════════════════════════════════════════════════════════════
+-- LexAssist — Migration 013: Brief excerpt computed column  (idempotent)
+-- Run in Supabase Dashboard > SQL Editor > New Query
+-- ═══════════════════════════════════════════════════════════════════
+
+-- 1. briefs.brief_excerpt — the first 1801 characters of content.
+--    When a case entry is analysed, up to four earlier briefs are read for
+--    the Claude context, but each is cut to 1800 characters (the extra
+--    one tells the caller that the text was truncated).  Brief content can be
+--    a whole OCR'd document, so selecting the full column shipped every
+--    byte only to discard most of it.  PostgREST exposes a function taking
+--    the row type as a computed column: select=content:brief_excerpt.
+CREATE OR REPLACE FUNCTION public.brief_excerpt(b public.briefs)
+RETURNS text AS $$
+  SELECT left(b.content, 1801);
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION public.brief_excerpt(public.briefs) TO authenticated, service_role;
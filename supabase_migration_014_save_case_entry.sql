@@ -0,0 +1,49 @@
+-- ═══════════════════════════════════════════════════════════════════
+-- LexAssist — Migration 014: Single-call case-entry save RPC  (idempotent)
+-- Run in Supabase Dashboard > SQL Editor > New Query
+-- ═══════════════════════════════════════════════════════════════════
+
+-- 1. Save a case-diary entry in one round trip.
+--    POST /api/cases/<id>/entry inserted the brief, waited for its id to
+--    insert the uploaded document's row.  The chain runs here instead and
+--    only the new ids come back (the case touch stays with the request's
+--    closing writes, stamped with the activity row's timestamp).
+--    p_document holds the case_documents columns (NULL for a text entry);
+--    case_id, user_id and brief_id are filled in here.  Being one function
+--    call, the rows are written atomically: no brief without its document.
+--    SECURITY INVOKER (the default) — RLS on every table still applies.
+CREATE OR REPLACE FUNCTION public.save_case_entry(
+  p_user_id  uuid,
+  p_case_id  uuid,
+  p_title    text,
+  p_content  text,
+  p_document jsonb
+)
+RETURNS jsonb AS $$
+DECLARE
+  v_brief_id    uuid;
+  v_document_id uuid;
+BEGIN
+  INSERT INTO public.briefs (user_id, case_id, title, content)
+  VALUES (p_user_id, p_case_id, p_title, p_content)
+  RETURNING id INTO v_brief_id;
+
+  IF p_document IS NOT NULL THEN
+    INSERT INTO public.case_documents (
+      user_id, case_id, brief_id, filename, file_size_bytes, mime_type,
+      extracted_text, is_ocr, document_type, document_title, classification,
+      language, metadata
+    )
+    SELECT p_user_id, p_case_id, v_brief_id, d.filename, d.file_size_bytes, d.mime_type,
+           d.extracted_text, d.is_ocr, d.document_type, d.document_title, d.classification,
+           d.language, d.metadata
+    FROM jsonb_populate_record(NULL::public.case_documents, p_document) d
+    RETURNING id INTO v_document_id;
+  END IF;
+
+  RETURN jsonb_build_object('brief_id', v_brief_id, 'document_id', v_document_id);
+END;
+$$ LANGUAGE plpgsql;
+
+GRANT EXECUTE ON FUNCTION public.save_case_entry(uuid, uuid, text, text, jsonb)
+  TO authenticated, service_role;